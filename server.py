@@ -1,10 +1,14 @@
 # Native libraries
-from json import dumps
+from json import dumps, loads
+from hashlib import sha256
 from os import getenv
 from typing import Annotated, Literal, List, Tuple
 from enum import Enum
 from pathlib import Path
 from io import BytesIO
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 logging.basicConfig(level=logging.INFO, force=True)
 logger = logging.getLogger("GenFilesMCP")
@@ -15,17 +19,99 @@ from requests import post, get
 from mcp.server.fastmcp import FastMCP, Context
 from mcp.server.session import ServerSession
 from docx import Document
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 # Utilities
 from utils.load_md_templates import load_md_templates
 from utils.upload_file import upload_file
 from utils.download_file import download_file
 from utils.knowledge import create_knowledge, add_file_to_knowledge
+from utils.profiler import RequestProfiler, RequestProfile
+from utils.idempotency import IdempotencyStore, idempotent
+from utils.auth import AuthCache, authenticated, get_bearer_token
+from utils.tables import docx_table, pptx_table
+from utils.script_executor import ScriptExecutor
+from utils.cancellation import run_cancellable
+from utils.delete_file import delete_file
+from utils.docx_index import DocxIndex, DocxIndexCache
+from utils.pdf_renderer import PdfRendererPool
+from utils.sessions import SessionStore, SESSION_OBJECT_NAMES, exec_capturing, install_save_hooks, estimate_memory, measure_document
 
 # Parameters
 URL = getenv('OWUI_URL',)
 PORT = int(getenv('PORT'))
 POWERPOINT_TEMPLATE, EXCEL_TEMPLATE, WORD_TEMPLATE,MARKDOWN_TEMPLATE, MCP_INSTRUCTIONS = load_md_templates()
+ADMIN_TOKEN = getenv('ADMIN_TOKEN')
+PROFILE_ENABLED = getenv('PROFILE_ENABLED', 'false').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TOP_N = int(getenv('PROFILE_TOP_N', '25'))
+PROFILE_MAX_ENTRIES = int(getenv('PROFILE_MAX_ENTRIES', '100'))
+IDEMPOTENCY_TTL = float(getenv('IDEMPOTENCY_TTL', '600'))
+AUTH_CACHE_TTL = float(getenv('AUTH_CACHE_TTL', '60'))
+SCRIPT_WORKERS = int(getenv('SCRIPT_WORKERS', '4'))
+HEAVY_SCRIPT_WORKERS = int(getenv('HEAVY_SCRIPT_WORKERS', '1'))
+SCRIPT_HEAVY_COST = float(getenv('SCRIPT_HEAVY_COST', '5000000'))
+SCRIPT_MAX_COST = float(getenv('SCRIPT_MAX_COST', '500000000'))
+DOCX_INDEX_CACHE_SIZE = int(getenv('DOCX_INDEX_CACHE_SIZE', '16'))
+DOCX_REGEX_WORKERS = int(getenv('DOCX_REGEX_WORKERS', '1'))
+DOCX_REGEX_TIMEOUT = float(getenv('DOCX_REGEX_TIMEOUT', '5'))
+PDF_RENDERER = getenv('PDF_RENDERER', 'unoserver')
+PDF_WORKERS = int(getenv('PDF_WORKERS', '2'))
+PDF_BASE_PORT = int(getenv('PDF_BASE_PORT', '2003'))
+PDF_TIMEOUT = float(getenv('PDF_TIMEOUT', '60'))
+PDF_CACHE_MB = float(getenv('PDF_CACHE_MB', '256'))
+SESSION_IDLE_TIMEOUT = float(getenv('SESSION_IDLE_TIMEOUT', '900'))
+SESSION_MAX_MB = float(getenv('SESSION_MAX_MB', '512'))
+SESSION_MAX_COUNT = int(getenv('SESSION_MAX_COUNT', '32'))
+SESSION_MEASURE_EVERY = int(getenv('SESSION_MEASURE_EVERY', '5'))
+
+# Per-request profiler for the script execution and upload pipeline
+PROFILER = RequestProfiler(
+    enabled=PROFILE_ENABLED,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    top_n=PROFILE_TOP_N,
+    max_entries=PROFILE_MAX_ENTRIES
+)
+
+# Store deduplicating retried tool calls
+IDEMPOTENCY = IdempotencyStore(ttl=IDEMPOTENCY_TTL)
+
+# Cache of bearer token validations against Open Web UI
+AUTH = AuthCache(url=URL, ttl=AUTH_CACHE_TTL)
+
+# Validation and worker pools for generation scripts
+SCRIPTS = ScriptExecutor(
+    workers=SCRIPT_WORKERS,
+    heavy_workers=HEAVY_SCRIPT_WORKERS,
+    heavy_cost=SCRIPT_HEAVY_COST,
+    max_cost=SCRIPT_MAX_COST
+)
+
+# Inverted indexes of the documents searched with search_docx
+DOCX_INDEXES = DocxIndexCache(max_entries=DOCX_INDEX_CACHE_SIZE)
+
+# Regex searches run on their own pool, each waiting for a child process killed after
+# DOCX_REGEX_TIMEOUT, so they never hold the threads used for downloads and uploads
+REGEX_SEARCHES = ThreadPoolExecutor(max_workers=DOCX_REGEX_WORKERS, thread_name_prefix="regex-search")
+
+# Persistent headless office renderers for PDF export
+PDF_RENDERERS = PdfRendererPool(
+    workers=PDF_WORKERS,
+    base_port=PDF_BASE_PORT,
+    timeout=PDF_TIMEOUT,
+    cache_mb=PDF_CACHE_MB,
+    executable=PDF_RENDERER
+)
+
+# Live documents kept between edit_session calls
+SESSIONS = SessionStore(
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    max_mb=SESSION_MAX_MB,
+    max_sessions=SESSION_MAX_COUNT,
+    measure_every=SESSION_MEASURE_EVERY
+)
+install_save_hooks()
 
 # Pydantic model for review comments
 class ReviewComment(BaseModel):
@@ -40,11 +126,152 @@ mcp = FastMCP(
     host = "0.0.0.0"
 )
 
+def delete_cancelled_upload(token: str, upload: asyncio.Future) -> None:
+    """
+    Delete the file created by an upload whose tool call was cancelled while it was in flight.
+    """
+    if upload.cancelled() or upload.exception() is not None:
+        return
+    response, request_data = upload.result()
+    if "file_path_download" in response:
+        logger.info(f"Deleting file {request_data['id']} uploaded for a cancelled request")
+        asyncio.get_running_loop().run_in_executor(None, delete_file, URL, token, request_data['id'])
+
+async def upload_and_index(
+    ctx: Context[ServerSession, None],
+    token: str,
+    file_data: BytesIO,
+    filename: str,
+    file_type: str,
+    user_id: str,
+    knowledge_name: str = 'My Generated Files',
+    report_progress: bool = True,
+    profile: RequestProfile | None = None
+) -> str:
+    """
+    Upload a file to Open Web UI and add it to the user's knowledge base, reporting progress
+    unless `report_progress` is False. The upload and knowledge update are recorded as
+    stages of `profile` when the request is profiled.
+
+    If the tool call is cancelled during the upload or the knowledge update, the uploaded
+    file is deleted: right away during the knowledge update, which is interrupted, and
+    once the request completes during the upload.
+
+    Returns:
+        str: The JSON response of `upload_file`.
+    """
+    profile = profile or RequestProfile()
+
+    # Upload the file. A request in flight cannot be interrupted without losing the id
+    # of the file it creates, so it is shielded and the file is deleted once it completes.
+    upload = asyncio.get_running_loop().run_in_executor(
+        None,
+        partial(
+            profile.wrap("upload", upload_file),
+            url=URL, 
+            token=token, 
+            file_data=file_data,
+            filename=filename,
+            file_type=file_type
+        )
+    )
+    try:
+        response, request_data = await asyncio.shield(upload)
+    except asyncio.CancelledError:
+        logger.info(f"Request cancelled during upload, the uploaded file will be deleted")
+        upload.add_done_callback(partial(delete_cancelled_upload, token))
+        raise
+
+    # If upload is successful, add to knowledge base
+    if "file_path_download" in response:
+        try:
+            if report_progress:
+                await ctx.report_progress(2, 4, f"Uploaded {file_data.getbuffer().nbytes} bytes")
+                await ctx.report_progress(3, 4, "Indexing queued")
+
+            # create knowledge base if not exists
+            create_knowledge_status = await run_cancellable(
+                None,
+                profile.wrap("knowledge", create_knowledge),
+                url=URL, 
+                token=token,
+                file_id=request_data['id'],
+                user_id=user_id,
+                knowledge_name=knowledge_name
+            )
+        except asyncio.CancelledError:
+            # Nobody will receive the download link, remove the uploaded file in the background
+            logger.info(f"Request cancelled, deleting uploaded file {request_data['id']}")
+            asyncio.get_running_loop().run_in_executor(None, delete_file, URL, token, request_data['id'])
+            raise
+
+        if create_knowledge_status:
+            logger.info("Knowledge base updated successfully.")
+        else:
+            logger.error(f"Error creating or updating knowledge base")
+    else:
+        logger.error(f"Error uploading file to knowledge base")
+
+    if report_progress:
+        await ctx.report_progress(4, 4, "Done")
+    return response
+
+async def add_pdf_copy(
+    ctx: Context[ServerSession, None],
+    token: str,
+    pdf_data: bytes | dict,
+    filename: str,
+    user_id: str,
+    response: str,
+    profile: RequestProfile | None = None
+) -> str:
+    """
+    Upload the PDF copy of a generated file and add its download link to the tool response.
+
+    Returns:
+        str: The tool response with 'pdf_path_download', or 'pdf_error' if the PDF could not be produced.
+    """
+    result = loads(response)
+    if isinstance(pdf_data, dict):
+        result["pdf_error"] = pdf_data["error"]["message"]
+        return dumps(result, indent=4, ensure_ascii=False)
+
+    pdf_buffer = BytesIO(pdf_data)
+    pdf_buffer.name = f'{filename}.pdf'
+    pdf_response = loads(await upload_and_index(
+        ctx=ctx,
+        token=token,
+        file_data=pdf_buffer,
+        filename=filename,
+        file_type="pdf",
+        user_id=user_id,
+        report_progress=False,
+        profile=profile
+    ))
+    if "file_path_download" in pdf_response:
+        result["pdf_path_download"] = pdf_response["file_path_download"]
+    else:
+        result["pdf_error"] = pdf_response["error"]["message"]
+    return dumps(result, indent=4, ensure_ascii=False)
+
+def session_still_open(response: str) -> bool:
+    """
+    Return False for a cached keep_session result whose editing session has since been
+    committed, closed or evicted, so a retry opens a new session instead of getting a dead handle.
+    """
+    try:
+        session_handle = loads(response).get("session_handle")
+    except (ValueError, TypeError, AttributeError):
+        return True
+    return session_handle is None or SESSIONS.is_open(session_handle)
+
 @mcp.tool(
     name = "generate_powerpoint",
     title = "Generate PowerPoint presentation",
     description = POWERPOINT_TEMPLATE
 )
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "generate_powerpoint", "user_id", "file_name", "python_script", "export_pdf", "keep_session", is_valid=session_still_open)
 async def generate_powerpoint(
     python_script: Annotated[
         str, 
@@ -58,7 +285,19 @@ async def generate_powerpoint(
         str,
         Field(description="User ID to associate the knowledge base with the correct user.")
     ],
-    ctx: Context[ServerSession, None]
+    ctx: Context[ServerSession, None],
+    export_pdf: Annotated[
+        bool,
+        Field(description="Also export a PDF copy of the generated PowerPoint file. Not allowed with keep_session: pass export_pdf to commit_session instead.")
+    ] = False,
+    keep_session: Annotated[
+        bool,
+        Field(description="Keep the presentation open in an editing session instead of uploading it. Returns a 'session_handle' for edit_session and commit_session.")
+    ] = False,
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
 ) -> dict:
     """
     Generate a PowerPoint file using a Python script.
@@ -66,48 +305,77 @@ async def generate_powerpoint(
     Returns:
         dict: Contains 'file_path_download' with a markdown hyperlink for downloading the generated PowerPoint file.
               Format: "[Download {filename}.pptx](/api/v1/files/{id}/content)"
+              With export_pdf, also 'pdf_path_download' with the hyperlink of the PDF copy.
+              With keep_session, only 'session_handle' and 'idle_timeout_seconds'.
     """
+    # With keep_session nothing is uploaded yet, so the PDF copy is made at commit_session
+    if keep_session and export_pdf:
+        return dumps(
+            {
+                "error": {
+                    "message": "export_pdf cannot be combined with keep_session. Pass export_pdf to commit_session instead."
+                }
+            },
+            indent=4,
+            ensure_ascii=False
+        )
+
     try:
-        # Create a buffer for the PowerPoint file
-        buffer = BytesIO()
-        buffer.name = f'{file_name}.pptx'
-        context = {"pptx_buffer": buffer}
-        exec(python_script, context)
+        # Validate the script and estimate its cost before running it
+        analysis = SCRIPTS.analyze(python_script, "pptx")
+        if "error" in analysis:
+            return dumps(analysis, indent=4, ensure_ascii=False)
 
-        # Reset buffer position to start
-        buffer.seek(0)
+        with PROFILER.profile(ctx.request_id, "generate_powerpoint") as profile:
+            # Create a buffer for the PowerPoint file
+            buffer = BytesIO()
+            buffer.name = f'{file_name}.pptx'
+            context = {"pptx_buffer": buffer, "pptx_table": pptx_table}
+            await ctx.report_progress(0, 4, "Running script")
+            runner = partial(exec_capturing, buffer=buffer) if keep_session else exec
+            document = await SCRIPTS.run(python_script, context, analysis, profile.wrap("script", runner))
+            await ctx.report_progress(1, 4, "Script finished")
 
-        # Retrieve authorization header from the request context
-        try:
-            bearer_token = ctx.request_context.request.headers.get("authorization")
-            logger.info(f"Recieved authorization header!")
-        except:
-            logger.error(f"Error retrieving authorization header")
+            # Keep the live presentation in an editing session instead of uploading it
+            if keep_session:
+                return dumps(
+                    SESSIONS.create(
+                        file_type="pptx",
+                        file_name=file_name,
+                        user_id=user_id,
+                        owner=sha256(get_bearer_token(ctx).encode('utf-8')).hexdigest(),
+                        document=document,
+                        size_bytes=estimate_memory(buffer)
+                    ),
+                    indent=4,
+                    ensure_ascii=False
+                )
 
-        # Upload the generated PowerPoint file
-        response, request_data = upload_file(
-            url=URL, 
-            token=bearer_token, 
-            file_data=buffer,
-            filename=file_name,
-            file_type="pptx"
-        )
+            # Reset buffer position to start
+            buffer.seek(0)
 
-        # If upload is successful, add to knowledge base
-        if "file_path_download" in response:
-            # create knowledge base if not exists
-            create_knowledge_status = create_knowledge(
-                url=URL, 
+            # Retrieve authorization header from the request context
+            bearer_token = get_bearer_token(ctx)
+
+            # Convert a copy to PDF with the renderer pool if requested
+            if export_pdf:
+                await ctx.report_progress(1.5, 4, "Converting to PDF")
+                pdf_data = await PDF_RENDERERS.convert(buffer.getvalue())
+
+            # Upload the generated PowerPoint file and add it to the knowledge base
+            response = await upload_and_index(
+                ctx=ctx,
                 token=bearer_token,
-                file_id=request_data['id'],
-                user_id=user_id
+                file_data=buffer,
+                filename=file_name,
+                file_type="pptx",
+                user_id=user_id,
+                profile=profile
             )
-            if create_knowledge_status:
-                logger.info("Knowledge base updated successfully.")
-            else:
-                logger.error(f"Error creating or updating knowledge base")
-        else:
-            logger.error(f"Error uploading file to knowledge base")
+
+            # Upload the PDF copy and add its link to the response
+            if export_pdf and "file_path_download" in response:
+                response = await add_pdf_copy(ctx, bearer_token, pdf_data, file_name, user_id, response, profile)
 
         return response 
     
@@ -127,6 +395,8 @@ async def generate_powerpoint(
     title = "Generate Excel workbook",
     description = EXCEL_TEMPLATE
 )
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "generate_excel", "user_id", "file_name", "python_script", "export_pdf", "keep_session", is_valid=session_still_open)
 async def generate_excel(
     python_script: Annotated[
         str, 
@@ -140,7 +410,19 @@ async def generate_excel(
         str,
         Field(description="User ID to associate the knowledge base with the correct user.")
     ],
-    ctx: Context[ServerSession, None]
+    ctx: Context[ServerSession, None],
+    export_pdf: Annotated[
+        bool,
+        Field(description="Also export a PDF copy of the generated Excel file. Not allowed with keep_session: pass export_pdf to commit_session instead.")
+    ] = False,
+    keep_session: Annotated[
+        bool,
+        Field(description="Keep the workbook open in an editing session instead of uploading it. Returns a 'session_handle' for edit_session and commit_session.")
+    ] = False,
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
 ) -> dict:
     """
     Generate an Excel file using a Python script.
@@ -148,48 +430,77 @@ async def generate_excel(
     Returns:
         dict: Contains 'file_path_download' with a markdown hyperlink for downloading the generated Excel file.
               Format: "[Download {filename}.xlsx](/api/v1/files/{id}/content)"
+              With export_pdf, also 'pdf_path_download' with the hyperlink of the PDF copy.
+              With keep_session, only 'session_handle' and 'idle_timeout_seconds'.
     """
+    # With keep_session nothing is uploaded yet, so the PDF copy is made at commit_session
+    if keep_session and export_pdf:
+        return dumps(
+            {
+                "error": {
+                    "message": "export_pdf cannot be combined with keep_session. Pass export_pdf to commit_session instead."
+                }
+            },
+            indent=4,
+            ensure_ascii=False
+        )
+
     try:
-        # Create a buffer for the Excel file
-        buffer = BytesIO()
-        buffer.name = f'{file_name}.xlsx'
-        context = {"xlsx_buffer": buffer}
-        exec(python_script, context)
+        # Validate the script and estimate its cost before running it
+        analysis = SCRIPTS.analyze(python_script, "xlsx")
+        if "error" in analysis:
+            return dumps(analysis, indent=4, ensure_ascii=False)
 
-        # Reset buffer position to start
-        buffer.seek(0)
+        with PROFILER.profile(ctx.request_id, "generate_excel") as profile:
+            # Create a buffer for the Excel file
+            buffer = BytesIO()
+            buffer.name = f'{file_name}.xlsx'
+            context = {"xlsx_buffer": buffer}
+            await ctx.report_progress(0, 4, "Running script")
+            runner = partial(exec_capturing, buffer=buffer) if keep_session else exec
+            document = await SCRIPTS.run(python_script, context, analysis, profile.wrap("script", runner))
+            await ctx.report_progress(1, 4, "Script finished")
 
-        # Retrieve authorization header from the request context
-        try:
-            bearer_token = ctx.request_context.request.headers.get("authorization")
-            logger.info(f"Recieved authorization header!")
-        except:
-            logger.error(f"Error retrieving authorization header")
+            # Keep the live workbook in an editing session instead of uploading it
+            if keep_session:
+                return dumps(
+                    SESSIONS.create(
+                        file_type="xlsx",
+                        file_name=file_name,
+                        user_id=user_id,
+                        owner=sha256(get_bearer_token(ctx).encode('utf-8')).hexdigest(),
+                        document=document,
+                        size_bytes=estimate_memory(buffer)
+                    ),
+                    indent=4,
+                    ensure_ascii=False
+                )
 
-        # Upload the generated Excel file
-        response, request_data = upload_file(
-            url=URL, 
-            token=bearer_token, 
-            file_data=buffer,
-            filename=file_name,
-            file_type="xlsx"
-        )
+            # Reset buffer position to start
+            buffer.seek(0)
 
-        # If upload is successful, add to knowledge base
-        if "file_path_download" in response:
-            # create knowledge base if not exists
-            create_knowledge_status = create_knowledge(
-                url=URL, 
+            # Retrieve authorization header from the request context
+            bearer_token = get_bearer_token(ctx)
+
+            # Convert a copy to PDF with the renderer pool if requested
+            if export_pdf:
+                await ctx.report_progress(1.5, 4, "Converting to PDF")
+                pdf_data = await PDF_RENDERERS.convert(buffer.getvalue())
+
+            # Upload the generated Excel file and add it to the knowledge base
+            response = await upload_and_index(
+                ctx=ctx,
                 token=bearer_token,
-                file_id=request_data['id'],
-                user_id=user_id
+                file_data=buffer,
+                filename=file_name,
+                file_type="xlsx",
+                user_id=user_id,
+                profile=profile
             )
-            if create_knowledge_status:
-                logger.info("Knowledge base updated successfully.")
-            else:
-                logger.error(f"Error creating or updating knowledge base")
-        else:
-            logger.error(f"Error uploading file to knowledge base")
+
+            # Upload the PDF copy and add its link to the response
+            if export_pdf and "file_path_download" in response:
+                response = await add_pdf_copy(ctx, bearer_token, pdf_data, file_name, user_id, response, profile)
 
         return response 
     
@@ -209,6 +520,8 @@ async def generate_excel(
     title = "Generate Word document",
     description = WORD_TEMPLATE
 )
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "generate_word", "user_id", "file_name", "python_script", "export_pdf", "keep_session", is_valid=session_still_open)
 async def generate_word(
     python_script: Annotated[
         str, 
@@ -222,7 +535,19 @@ async def generate_word(
         str,
         Field(description="User ID to associate the knowledge base with the correct user.")
     ],
-    ctx: Context[ServerSession, None]
+    ctx: Context[ServerSession, None],
+    export_pdf: Annotated[
+        bool,
+        Field(description="Also export a PDF copy of the generated Word file. Not allowed with keep_session: pass export_pdf to commit_session instead.")
+    ] = False,
+    keep_session: Annotated[
+        bool,
+        Field(description="Keep the document open in an editing session instead of uploading it. Returns a 'session_handle' for edit_session and commit_session.")
+    ] = False,
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
 ) -> dict:
     """
     Generate a Word file using a Python script.
@@ -230,48 +555,77 @@ async def generate_word(
     Returns:
         dict: Contains 'file_path_download' with a markdown hyperlink for downloading the generated Word file.
               Format: "[Download {filename}.docx](/api/v1/files/{id}/content)"
+              With export_pdf, also 'pdf_path_download' with the hyperlink of the PDF copy.
+              With keep_session, only 'session_handle' and 'idle_timeout_seconds'.
     """
+    # With keep_session nothing is uploaded yet, so the PDF copy is made at commit_session
+    if keep_session and export_pdf:
+        return dumps(
+            {
+                "error": {
+                    "message": "export_pdf cannot be combined with keep_session. Pass export_pdf to commit_session instead."
+                }
+            },
+            indent=4,
+            ensure_ascii=False
+        )
+
     try:
-        # Create a buffer for the Word file
-        buffer = BytesIO()
-        buffer.name = f'{file_name}.docx'
-        context = {"docx_buffer": buffer}
-        exec(python_script, context)
+        # Validate the script and estimate its cost before running it
+        analysis = SCRIPTS.analyze(python_script, "docx")
+        if "error" in analysis:
+            return dumps(analysis, indent=4, ensure_ascii=False)
 
-        # Reset buffer position to start
-        buffer.seek(0)
+        with PROFILER.profile(ctx.request_id, "generate_word") as profile:
+            # Create a buffer for the Word file
+            buffer = BytesIO()
+            buffer.name = f'{file_name}.docx'
+            context = {"docx_buffer": buffer, "docx_table": docx_table}
+            await ctx.report_progress(0, 4, "Running script")
+            runner = partial(exec_capturing, buffer=buffer) if keep_session else exec
+            document = await SCRIPTS.run(python_script, context, analysis, profile.wrap("script", runner))
+            await ctx.report_progress(1, 4, "Script finished")
 
-        # Retrieve authorization header from the request context
-        try:
-            bearer_token = ctx.request_context.request.headers.get("authorization")
-            logger.info(f"Recieved authorization header!")
-        except:
-            logger.error(f"Error retrieving authorization header")
+            # Keep the live document in an editing session instead of uploading it
+            if keep_session:
+                return dumps(
+                    SESSIONS.create(
+                        file_type="docx",
+                        file_name=file_name,
+                        user_id=user_id,
+                        owner=sha256(get_bearer_token(ctx).encode('utf-8')).hexdigest(),
+                        document=document,
+                        size_bytes=estimate_memory(buffer)
+                    ),
+                    indent=4,
+                    ensure_ascii=False
+                )
 
-        # Upload the generated Word file
-        response, request_data = upload_file(
-            url=URL, 
-            token=bearer_token, 
-            file_data=buffer,
-            filename=file_name,
-            file_type="docx"
-        )
+            # Reset buffer position to start
+            buffer.seek(0)
 
-        # If upload is successful, add to knowledge base
-        if "file_path_download" in response:
-            # create knowledge base if not exists
-            create_knowledge_status = create_knowledge(
-                url=URL, 
+            # Retrieve authorization header from the request context
+            bearer_token = get_bearer_token(ctx)
+
+            # Convert a copy to PDF with the renderer pool if requested
+            if export_pdf:
+                await ctx.report_progress(1.5, 4, "Converting to PDF")
+                pdf_data = await PDF_RENDERERS.convert(buffer.getvalue())
+
+            # Upload the generated Word file and add it to the knowledge base
+            response = await upload_and_index(
+                ctx=ctx,
                 token=bearer_token,
-                file_id=request_data['id'],
-                user_id=user_id
+                file_data=buffer,
+                filename=file_name,
+                file_type="docx",
+                user_id=user_id,
+                profile=profile
             )
-            if create_knowledge_status:
-                logger.info("Knowledge base updated successfully.")
-            else:
-                logger.error(f"Error creating or updating knowledge base")
-        else:
-            logger.error(f"Error uploading file to knowledge base")
+
+            # Upload the PDF copy and add its link to the response
+            if export_pdf and "file_path_download" in response:
+                response = await add_pdf_copy(ctx, bearer_token, pdf_data, file_name, user_id, response, profile)
 
         return response 
     
@@ -291,6 +645,8 @@ async def generate_word(
     title = "Generate Markdown document",
     description = MARKDOWN_TEMPLATE
 ) 
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "generate_markdown", "user_id", "file_name", "python_script")
 async def generate_markdown(
     python_script: Annotated[
         str, 
@@ -304,7 +660,11 @@ async def generate_markdown(
         str,
         Field(description="User ID to associate the knowledge base with the correct user.")
     ],
-    ctx: Context[ServerSession, None]
+    ctx: Context[ServerSession, None],
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
 ) -> dict:
     """
     Generate a Markdown file using a Python script.
@@ -314,46 +674,36 @@ async def generate_markdown(
               Format: "[Download {filename}.md](/api/v1/files/{id}/content)"
     """
     try:
-        # Create a buffer for the Markdown file
-        buffer = BytesIO()
-        buffer.name = f'{file_name}.md'
-        context = {"md_buffer": buffer}
-        exec(python_script, context)
+        # Validate the script and estimate its cost before running it
+        analysis = SCRIPTS.analyze(python_script, "md")
+        if "error" in analysis:
+            return dumps(analysis, indent=4, ensure_ascii=False)
 
-        # Reset buffer position to start
-        buffer.seek(0)
+        with PROFILER.profile(ctx.request_id, "generate_markdown") as profile:
+            # Create a buffer for the Markdown file
+            buffer = BytesIO()
+            buffer.name = f'{file_name}.md'
+            context = {"md_buffer": buffer}
+            await ctx.report_progress(0, 4, "Running script")
+            await SCRIPTS.run(python_script, context, analysis, profile.wrap("script", exec))
+            await ctx.report_progress(1, 4, "Script finished")
 
-        # Retrieve authorization header from the request context
-        try:
-            bearer_token = ctx.request_context.request.headers.get("authorization")
-            logger.info(f"Recieved authorization header!")
-        except:
-            logger.error(f"Error retrieving authorization header")
+            # Reset buffer position to start
+            buffer.seek(0)
 
-        # Upload the generated Markdown file
-        response, request_data = upload_file(
-            url=URL, 
-            token=bearer_token, 
-            file_data=buffer,
-            filename=file_name,
-            file_type="md"
-        )
+            # Retrieve authorization header from the request context
+            bearer_token = get_bearer_token(ctx)
 
-        # If upload is successful, add to knowledge base
-        if "file_path_download" in response:
-            # create knowledge base if not exists
-            create_knowledge_status = create_knowledge(
-                url=URL, 
+            # Upload the generated Markdown file and add it to the knowledge base
+            response = await upload_and_index(
+                ctx=ctx,
                 token=bearer_token,
-                file_id=request_data['id'],
-                user_id=user_id
+                file_data=buffer,
+                filename=file_name,
+                file_type="md",
+                user_id=user_id,
+                profile=profile
             )
-            if create_knowledge_status:
-                logger.info("Knowledge base updated successfully.")
-            else:
-                logger.error(f"Error creating or updating knowledge base")
-        else:
-            logger.error(f"Error uploading file to knowledge base")
 
         return response 
     
@@ -374,6 +724,8 @@ async def generate_markdown(
     description="""Return the index, style and text of each element in a docx document. This includes paragraphs, headings, tables, images, and other components. The output is a JSON object that provides a detailed representation of the document's structure and content.
     The Agent will use this tool to understand the content and structure of the document before perform corrections (spelling, grammar, style suggestions, idea enhancements). Agent have to identify the index of each element to be able to add comments in the review_docx tool."""
 )
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "full_context_docx", "file_id", "file_name")
 async def full_context_docx(
     file_id: Annotated[
         str, 
@@ -383,7 +735,11 @@ async def full_context_docx(
         str, 
         Field(description="The name of the original docx file")
     ],
-    ctx: Context[ServerSession, None]
+    ctx: Context[ServerSession, None],
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
 ) -> dict:
     """
     Return the structure of a docx document including index, style, and text of each element.
@@ -391,15 +747,13 @@ async def full_context_docx(
         dict: A JSON object with the structure of the document.
     """
     # Retrieve authorization header from the request context
-    try:
-        bearer_token = ctx.request_context.request.headers.get("authorization")
-        logger.info(f"Recieved authorization header!")
-    except:
-        logger.error(f"Error retrieving authorization header")
+    bearer_token = get_bearer_token(ctx)
 
     try:
         # Download in memory the docx file using the download_file helper
-        docx_file = download_file(
+        docx_file = await run_cancellable(
+            None,
+            download_file,
             url=URL, 
             token=bearer_token, 
             file_id=file_id
@@ -457,11 +811,95 @@ async def full_context_docx(
             ensure_ascii=False
         )
 
+@mcp.tool(
+    name="search_docx",
+    title="Search paragraphs of a docx document",
+    description="""Search the paragraphs of a docx document by keywords, exact phrase or regular expression. Returns the index, style, heading path and a snippet of each matching paragraph.
+    Use this tool instead of full_context_docx on long documents to find only the relevant parts; the returned indexes can be used directly in the review_docx tool."""
+)
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "search_docx", "file_id", "query", "mode", "max_results")
+async def search_docx(
+    file_id: Annotated[
+        str, 
+        Field(description="ID of the existing docx file to search (from a previous chat upload).")
+    ],
+    file_name: Annotated[
+        str, 
+        Field(description="The name of the original docx file")
+    ],
+    query: Annotated[
+        str,
+        Field(description="Keywords (all must appear, any order), exact phrase or regular expression, depending on mode.")
+    ],
+    ctx: Context[ServerSession, None],
+    mode: Annotated[
+        Literal["keyword", "phrase", "regex"],
+        Field(description="Search mode: 'keyword', 'phrase' or 'regex'.")
+    ] = "keyword",
+    max_results: Annotated[
+        int,
+        Field(description="Maximum number of matching paragraphs to return.", ge=1, le=200)
+    ] = 20,
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
+) -> dict:
+    """
+    Search the paragraphs of a docx document using a cached inverted index.
+    Returns:
+        dict: A JSON object with the total number of matches and the matching paragraphs.
+    """
+    # Retrieve authorization header from the request context
+    bearer_token = get_bearer_token(ctx)
+
+    try:
+        # Indexes are cached per caller so a document is never served to another token
+        index_key = f"{sha256(bearer_token.encode('utf-8')).hexdigest()}:{file_id}"
+        index = DOCX_INDEXES.get(index_key)
+
+        if index is None:
+            # Download in memory the docx file using the download_file helper
+            docx_file = await run_cancellable(None, download_file, URL, bearer_token, file_id)
+            if isinstance(docx_file, dict) and "error" in docx_file:
+                return dumps(docx_file, indent=4, ensure_ascii=False)
+
+            index = await run_cancellable(None, DocxIndex, docx_file)
+            DOCX_INDEXES.put(index_key, index)
+            logger.info(f"Indexed {len(index.paragraphs)} paragraphs of file {file_id}")
+
+        result = await run_cancellable(REGEX_SEARCHES if mode == "regex" else None, index.search, query, mode, max_results, DOCX_REGEX_TIMEOUT)
+        if "error" in result:
+            return dumps(result, indent=4, ensure_ascii=False)
+
+        return dumps(
+            {
+                "file_name": file_name,
+                "file_id": file_id,
+                **result
+            },
+            indent=4,
+            ensure_ascii=False
+        )
+    except Exception as e:
+        return dumps(
+            {
+                "error": {
+                    "message": str(e)
+                }
+            }, 
+            indent=4, 
+            ensure_ascii=False
+        )
+
 @mcp.tool(
     name="review_docx",
     title="Review and comment on docx document",
     description="""Review an existing docx document, perform corrections (spelling, grammar, style suggestions, idea enhancements), and add comments to cells. Returns a markdown hyperlink for downloading the reviewed file."""
 )
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "review_docx", "user_id", "file_id", "file_name", "review_comments")
 async def review_docx(
     file_id: Annotated[
         str, 
@@ -479,7 +917,11 @@ async def review_docx(
         str,
         Field(description="User ID to associate the knowledge base with the correct user.")
     ],
-    ctx: Context[ServerSession, None]
+    ctx: Context[ServerSession, None],
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
 ) -> dict:
     """
     Review an existing docx document and add comments to specified elements.
@@ -488,77 +930,62 @@ async def review_docx(
               Format: "[Download {filename}.docx](/api/v1/files/{id}/content)"
     """
     # Retrieve authorization header from the request context
-    try:
-        bearer_token = ctx.request_context.request.headers.get("authorization")
-        logger.info(f"Recieved authorization header!")
-    except:
-        logger.error(f"Error retrieving authorization header")
+    bearer_token = get_bearer_token(ctx)
 
     try:
-        
-        # Download the existing docx file
-        docx_file = download_file(URL, bearer_token, file_id)
-        if isinstance(docx_file, dict) and "error" in docx_file:
-            return dumps(docx_file, indent=4, ensure_ascii=False)
-
-        # Load the document
-        doc = Document(docx_file)
-
-        # Add comments to specified paragraphs
-        paragraphs = list(doc.paragraphs)  # Get list of paragraphs
-        for item in review_comments:
-            try:
-                index = item.index
-                comment_text = item.comment
-            except (AttributeError, TypeError):
-                # malformed item; skip
-                continue
-
-            if index is None or comment_text is None:
-                continue
-
-            if 0 <= index < len(paragraphs):
-                para = paragraphs[index]
-                if para.runs:  # Ensure there are runs to comment on
-                    # Add comment to the first run of the paragraph
-                    doc.add_comment(
-                        runs=[para.runs[0]],
-                        text=comment_text,
-                        author="AI Reviewer",
-                        initials="AI"
-                    )
-
-        # Create a buffer for the reviewed file
-        buffer = BytesIO()
-        buffer.name = f'{Path(file_name).stem}_reviewed.docx'
-        doc.save(buffer)
-        buffer.seek(0)
-
-        # Upload the reviewed docx file
-        response, request_data = upload_file(
-            url=URL, 
-            token=bearer_token, 
-            file_data=buffer,
-            filename=f"{Path(file_name).stem}_reviewed",
-            file_type="docx"
-        )
+        with PROFILER.profile(ctx.request_id, "review_docx") as profile:
+            # Download the existing docx file
+            await ctx.report_progress(0, 4, "Downloading document")
+            docx_file = await run_cancellable(None, profile.wrap("download", download_file), URL, bearer_token, file_id)
+            if isinstance(docx_file, dict) and "error" in docx_file:
+                return dumps(docx_file, indent=4, ensure_ascii=False)
 
-        # If upload is successful, add to knowledge base
-        if "file_path_download" in response:
-            # create knowledge base if not exists
-            create_knowledge_status = create_knowledge(
-                url=URL, 
+            # Load the document
+            doc = profile.wrap("load", Document)(docx_file)
+
+            # Add comments to specified paragraphs
+            paragraphs = list(doc.paragraphs)  # Get list of paragraphs
+            for item in review_comments:
+                try:
+                    index = item.index
+                    comment_text = item.comment
+                except (AttributeError, TypeError):
+                    # malformed item; skip
+                    continue
+
+                if index is None or comment_text is None:
+                    continue
+
+                if 0 <= index < len(paragraphs):
+                    para = paragraphs[index]
+                    if para.runs:  # Ensure there are runs to comment on
+                        # Add comment to the first run of the paragraph
+                        doc.add_comment(
+                            runs=[para.runs[0]],
+                            text=comment_text,
+                            author="AI Reviewer",
+                            initials="AI"
+                        )
+
+            # Create a buffer for the reviewed file
+            buffer = BytesIO()
+            buffer.name = f'{Path(file_name).stem}_reviewed.docx'
+            profile.wrap("save", doc.save)(buffer)
+            buffer.seek(0)
+
+            await ctx.report_progress(1, 4, "Comments added")
+
+            # Upload the reviewed docx file and add it to the knowledge base
+            response = await upload_and_index(
+                ctx=ctx,
                 token=bearer_token,
-                file_id=request_data['id'],
+                file_data=buffer,
+                filename=f"{Path(file_name).stem}_reviewed",
+                file_type="docx",
                 user_id=user_id,
-                knowledge_name="Documents Reviewed by AI"
+                knowledge_name="Documents Reviewed by AI",
+                profile=profile
             )
-            if create_knowledge_status:
-                logger.info("Knowledge base updated successfully.")
-            else:
-                logger.error(f"Error creating or updating knowledge base")
-        else:
-            logger.error(f"Error uploading file to knowledge base")
 
         return response
     
@@ -573,6 +1000,280 @@ async def review_docx(
             ensure_ascii=False
         )
     
+@mcp.tool(
+    name="convert_to_pdf",
+    title="Convert a file to PDF",
+    description="""Convert an existing PowerPoint, Word or Excel file (for example one generated by another tool) to PDF. Returns a markdown hyperlink for downloading the PDF file."""
+)
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "convert_to_pdf", "user_id", "file_id")
+async def convert_to_pdf(
+    file_id: Annotated[
+        str, 
+        Field(description="ID of the existing pptx, docx or xlsx file to convert.")
+    ],
+    file_name: Annotated[
+        str, 
+        Field(description="The name of the original file")
+    ],
+    user_id: Annotated[
+        str,
+        Field(description="User ID to associate the knowledge base with the correct user.")
+    ],
+    ctx: Context[ServerSession, None],
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
+) -> dict:
+    """
+    Convert an existing file to PDF using the persistent renderer pool.
+    Returns:
+        dict: Contains 'file_path_download' with a markdown hyperlink for downloading the PDF file.
+              Format: "[Download {filename}.pdf](/api/v1/files/{id}/content)"
+    """
+    # Retrieve authorization header from the request context
+    bearer_token = get_bearer_token(ctx)
+
+    try:
+        # Download the existing file
+        await ctx.report_progress(0, 4, "Downloading file")
+        source_file = await run_cancellable(None, download_file, URL, bearer_token, file_id)
+        if isinstance(source_file, dict) and "error" in source_file:
+            return dumps(source_file, indent=4, ensure_ascii=False)
+
+        # Convert it with the renderer pool
+        await ctx.report_progress(1, 4, "Converting to PDF")
+        pdf_data = await PDF_RENDERERS.convert(source_file.getvalue())
+        if isinstance(pdf_data, dict):
+            return dumps(pdf_data, indent=4, ensure_ascii=False)
+
+        # Create a buffer for the PDF file
+        buffer = BytesIO(pdf_data)
+        buffer.name = f'{Path(file_name).stem}.pdf'
+
+        # Upload the PDF file and add it to the knowledge base
+        return await upload_and_index(
+            ctx=ctx,
+            token=bearer_token,
+            file_data=buffer,
+            filename=Path(file_name).stem,
+            file_type="pdf",
+            user_id=user_id
+        )
+    
+    except Exception as e:
+        return dumps(
+            {
+                "error": {
+                    "message": str(e)
+                }
+            }, 
+            indent=4, 
+            ensure_ascii=False
+        )
+
+@mcp.tool(
+    name="edit_session",
+    title="Edit a document kept in an editing session",
+    description="""Run a Python script against the live PowerPoint, Word or Excel file of an editing session opened with keep_session on generate_powerpoint, generate_word or generate_excel. Only the requested changes are applied; nothing is regenerated or uploaded.
+    The live object is available as `prs` (Presentation), `doc` (Document) or `wb` (Workbook); do not create a new one and do not save it. Variables defined by previous edits of the session remain available, as well as `pptx_table` and `docx_table`. Import only the packages allowed by the template of the file type. Call commit_session to upload the result."""
+)
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "edit_session")
+async def edit_session(
+    session_handle: Annotated[
+        str,
+        Field(description="Handle returned by a generate tool called with keep_session.")
+    ],
+    python_script: Annotated[
+        str,
+        Field(description="Python script modifying the live object (`prs`, `doc` or `wb`) of the session.")
+    ],
+    ctx: Context[ServerSession, None],
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
+) -> dict:
+    """
+    Apply a Python script to the live document of an editing session.
+    Returns:
+        dict: Contains 'session_handle' and a confirmation message.
+    """
+    try:
+        session = SESSIONS.get(session_handle, sha256(get_bearer_token(ctx).encode('utf-8')).hexdigest())
+        if isinstance(session, dict):
+            return dumps(session, indent=4, ensure_ascii=False)
+
+        # Validate the script and estimate its cost before running it
+        analysis = SCRIPTS.analyze(python_script, session.file_type, require_buffer=False)
+        if "error" in analysis:
+            return dumps(analysis, indent=4, ensure_ascii=False)
+
+        async with session.lock:
+            with PROFILER.profile(ctx.request_id, "edit_session") as profile:
+                object_name = SESSION_OBJECT_NAMES[session.file_type]
+                session.context.update({
+                    object_name: session.document,
+                    "pptx_table": pptx_table,
+                    "docx_table": docx_table
+                })
+                await ctx.report_progress(0, 1, "Running script")
+                await SCRIPTS.run(python_script, session.context, analysis, profile.wrap("script", exec))
+                await ctx.report_progress(1, 1, "Script finished")
+
+                # Adopt the object if the script replaced it
+                if isinstance(session.context.get(object_name), type(session.document)):
+                    session.document = session.context[object_name]
+
+                # Account for the edit in the memory cap, measuring the whole document only periodically
+                measured = SESSIONS.should_measure(session, analysis)
+                if measured:
+                    size_bytes = await run_cancellable(None, profile.wrap("measure", measure_document), session.document)
+                else:
+                    size_bytes = SESSIONS.estimate_edit(session, analysis)
+                resize_error = SESSIONS.resize(session_handle, size_bytes, measured)
+                if resize_error:
+                    return dumps(resize_error, indent=4, ensure_ascii=False)
+
+        return dumps(
+            {
+                "session_handle": session_handle,
+                "message": f"Edit applied to {session.file_name}.{session.file_type}. Call commit_session to upload it."
+            },
+            indent=4,
+            ensure_ascii=False
+        )
+
+    except Exception as e:
+        return dumps(
+            {
+                "error": {
+                    "message": str(e)
+                }
+            }, 
+            indent=4, 
+            ensure_ascii=False
+        )
+
+@mcp.tool(
+    name="commit_session",
+    title="Upload the document of an editing session",
+    description="""Save the live document of an editing session, upload it and add it to the user's knowledge base. Returns a markdown hyperlink for downloading the file. The session is closed unless keep_open is set."""
+)
+@authenticated(AUTH)
+@idempotent(IDEMPOTENCY, "commit_session")
+async def commit_session(
+    session_handle: Annotated[
+        str,
+        Field(description="Handle returned by a generate tool called with keep_session.")
+    ],
+    ctx: Context[ServerSession, None],
+    export_pdf: Annotated[
+        bool,
+        Field(description="Also export a PDF copy of the file.")
+    ] = False,
+    keep_open: Annotated[
+        bool,
+        Field(description="Keep the session open for further edits after uploading.")
+    ] = False,
+    idempotency_key: Annotated[
+        str | None,
+        Field(description="Optional key identifying this request. Retries with the same key return the result of the first call instead of running it again.")
+    ] = None
+) -> dict:
+    """
+    Save and upload the live document of an editing session.
+    Returns:
+        dict: Contains 'file_path_download' with a markdown hyperlink for downloading the file.
+              Format: "[Download {filename}.{ext}](/api/v1/files/{id}/content)"
+              With export_pdf, also 'pdf_path_download' with the hyperlink of the PDF copy.
+    """
+    # Retrieve authorization header from the request context
+    bearer_token = get_bearer_token(ctx)
+
+    try:
+        session = SESSIONS.get(session_handle, sha256(bearer_token.encode('utf-8')).hexdigest())
+        if isinstance(session, dict):
+            return dumps(session, indent=4, ensure_ascii=False)
+
+        async with session.lock:
+            with PROFILER.profile(ctx.request_id, "commit_session") as profile:
+                # Save the live document to a buffer
+                buffer = BytesIO()
+                buffer.name = f'{session.file_name}.{session.file_type}'
+                await ctx.report_progress(0, 4, "Saving document")
+                await run_cancellable(None, profile.wrap("save", session.document.save), buffer)
+                if keep_open:
+                    # The saved file gives an up to date memory estimate for free
+                    SESSIONS.resize(session_handle, estimate_memory(buffer))
+                buffer.seek(0)
+                await ctx.report_progress(1, 4, "Document saved")
+
+                # Convert a copy to PDF with the renderer pool if requested
+                if export_pdf:
+                    await ctx.report_progress(1.5, 4, "Converting to PDF")
+                    pdf_data = await PDF_RENDERERS.convert(buffer.getvalue())
+
+                # Upload the file and add it to the knowledge base
+                response = await upload_and_index(
+                    ctx=ctx,
+                    token=bearer_token,
+                    file_data=buffer,
+                    filename=session.file_name,
+                    file_type=session.file_type,
+                    user_id=session.user_id,
+                    profile=profile
+                )
+
+                # Upload the PDF copy and add its link to the response
+                if export_pdf and "file_path_download" in response:
+                    response = await add_pdf_copy(ctx, bearer_token, pdf_data, session.file_name, session.user_id, response, profile)
+
+        if "file_path_download" in response and not keep_open:
+            SESSIONS.close(session_handle)
+
+        return response
+
+    except Exception as e:
+        return dumps(
+            {
+                "error": {
+                    "message": str(e)
+                }
+            }, 
+            indent=4, 
+            ensure_ascii=False
+        )
+
+def is_admin(request: Request) -> bool:
+    """
+    Check the admin bearer token of a request. Admin endpoints are disabled when ADMIN_TOKEN is not set.
+    """
+    return bool(ADMIN_TOKEN) and request.headers.get("authorization") == f"Bearer {ADMIN_TOKEN}"
+
+@mcp.custom_route("/admin/profiles", methods=["GET"])
+async def list_profiles(request: Request) -> JSONResponse:
+    """
+    List the stored request profiles, newest first.
+    """
+    if not is_admin(request):
+        return JSONResponse({"error": {"message": "Unauthorized"}}, status_code=401)
+    return JSONResponse({"profiles": PROFILER.list_profiles()})
+
+@mcp.custom_route("/admin/profiles/{profile_id}", methods=["GET"])
+async def get_profile(request: Request) -> JSONResponse:
+    """
+    Return the hot functions recorded for a single request.
+    """
+    if not is_admin(request):
+        return JSONResponse({"error": {"message": "Unauthorized"}}, status_code=401)
+    profile = PROFILER.get_profile(request.path_params["profile_id"])
+    if profile is None:
+        return JSONResponse({"error": {"message": "Profile not found"}}, status_code=404)
+    return JSONResponse(profile)
+
 # Initialize and run the server
 if __name__ == "__main__":
     mcp.run(
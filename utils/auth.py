@@ -0,0 +1,171 @@
+from base64 import urlsafe_b64decode
+from collections import OrderedDict
+from functools import wraps
+from hashlib import sha256
+from json import dumps, loads
+from threading import Lock
+from time import monotonic, time
+from requests import get
+from requests.exceptions import RequestException
+import asyncio
+import logging
+logging.basicConfig(level=logging.INFO, force=True)
+logger = logging.getLogger("GenFilesMCP")
+
+def get_bearer_token(ctx) -> str | None:
+    """
+    Retrieve the authorization header from the request context of a tool call.
+    Args:
+        ctx (Context): The MCP context of the tool call.
+    Returns:
+        str | None: The authorization header, or None if it is not available.
+    """
+    try:
+        bearer_token = ctx.request_context.request.headers.get("authorization")
+    except (AttributeError, ValueError):
+        bearer_token = None
+
+    if bearer_token:
+        logger.info(f"Recieved authorization header!")
+    else:
+        logger.error(f"Error retrieving authorization header")
+    return bearer_token
+
+def _jwt_expiry(token: str) -> float | None:
+    """
+    Return the 'exp' claim of a JWT bearer token without verifying its signature, or None.
+    """
+    try:
+        payload = token.split(" ")[-1].split(".")[1]
+        claims = loads(urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"]) if claims.get("exp") is not None else None
+    except (IndexError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+class AuthCache:
+    """
+    Validate bearer tokens against Open Web UI and cache the outcome by token hash.
+
+    Both valid and invalid tokens are cached for `ttl` seconds, so repeated calls
+    with a bad token are rejected without reaching Open Web UI. Validations run
+    on worker threads so they never block the event loop.
+    """
+
+    def __init__(self, url: str, ttl: float = 60, max_entries: int = 1000):
+        """
+        Args:
+            url (str): The base URL of Open Web UI.
+            ttl (float): Seconds a validation result is cached.
+            max_entries (int): Maximum number of tokens kept in the cache.
+        """
+        self.url = url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = Lock()
+        # Validations running against Open Web UI, by token hash
+        self._in_flight = {}
+
+    def _cached(self, key: str) -> bool | None:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, valid = entry
+            if expires_at < monotonic():
+                del self._cache[key]
+                return None
+            return valid
+
+    def _store(self, key: str, valid: bool, ttl: float) -> None:
+        with self._lock:
+            self._cache[key] = (monotonic() + ttl, valid)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _validate(self, token: str) -> bool | dict:
+        """
+        Ask Open Web UI whether a token is valid. Blocking, run on a worker thread.
+        Returns:
+            bool | dict: True or False, or {"error": {"message": "error description"}} if Open Web UI could not tell.
+        """
+        try:
+            response = get(
+                f'{self.url}/api/v1/auths/',
+                headers={'Authorization': token, 'Accept': 'application/json'},
+                timeout=10
+            )
+        except RequestException as e:
+            return {"error": {"message": f'Error validating authorization token: {e}'}}
+
+        if response.status_code not in (200, 401, 403):
+            return {"error": {"message": f'Error validating authorization token: {response.status_code}'}}
+        return response.status_code == 200
+
+    async def check(self, token: str | None) -> dict | None:
+        """
+        Check a bearer token. On a cache miss the token is validated on a worker thread,
+        and concurrent checks of the same token share a single request to Open Web UI.
+        Args:
+            token (str | None): The authorization header of the request.
+        Returns:
+            dict | None: None if the token is valid, otherwise {"error": {"message": "error description"}}.
+        """
+        if not token:
+            return {"error": {"message": "Missing authorization header"}}
+
+        expiry = _jwt_expiry(token)
+        if expiry is not None and expiry <= time():
+            return {"error": {"message": "Authorization token expired"}}
+
+        key = sha256(token.encode("utf-8")).hexdigest()
+        valid = self._cached(key)
+
+        if valid is None:
+            validation = self._in_flight.get(key)
+            if validation is None:
+                validation = asyncio.get_running_loop().run_in_executor(None, self._validate, token)
+                self._in_flight[key] = validation
+
+                def _done(finished: asyncio.Future) -> None:
+                    self._in_flight.pop(key, None)
+                    # Do not cache errors: Open Web UI being unreachable says nothing about the token
+                    if not finished.cancelled() and isinstance(finished.result(), bool):
+                        ttl = self.ttl if expiry is None else min(self.ttl, expiry - time())
+                        self._store(key, finished.result(), ttl)
+
+                validation.add_done_callback(_done)
+
+            # Shield the shared request so one cancelled caller does not cancel it for the others
+            valid = await asyncio.shield(validation)
+            if isinstance(valid, dict):
+                return valid
+
+        if not valid:
+            return {"error": {"message": "Invalid authorization token"}}
+        return None
+
+def authenticated(auth: AuthCache):
+    """
+    Decorator for MCP tools that rejects calls with a missing, expired or invalid
+    bearer token before any work is done.
+
+    Args:
+        auth (AuthCache): Cache used to validate the token.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                token = kwargs["ctx"].request_context.request.headers.get("authorization")
+            except (KeyError, AttributeError, ValueError):
+                token = None
+
+            auth_error = await auth.check(token)
+            if auth_error:
+                logger.error(f"Rejected {fn.__name__} call: {auth_error['error']['message']}")
+                return dumps(auth_error, indent=4, ensure_ascii=False)
+            return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
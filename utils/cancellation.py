@@ -0,0 +1,80 @@
+from functools import partial
+from threading import Lock, get_ident
+import asyncio
+import ctypes
+import logging
+logging.basicConfig(level=logging.INFO, force=True)
+logger = logging.getLogger("GenFilesMCP")
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a worker thread when the tool call that started it is cancelled.
+
+    Like asyncio.CancelledError and KeyboardInterrupt it derives from BaseException,
+    so `except Exception` handlers in generation scripts do not swallow it.
+    """
+
+def _set_async_exc(thread_id: int, exc_type: type | None) -> None:
+    """
+    Schedule `exc_type` to be raised in a thread, or clear a pending one when None.
+    """
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id),
+        ctypes.py_object(exc_type) if exc_type is not None else ctypes.c_void_p(0)
+    )
+
+class _ThreadJob:
+    """
+    Blocking callable run on a worker thread that can be interrupted from the event loop.
+    """
+
+    def __init__(self, fn, args: tuple, kwargs: dict):
+        self.fn = partial(fn, *args, **kwargs)
+        self.lock = Lock()
+        self.thread_id = None
+        self.cancelled = False
+
+    def __call__(self):
+        with self.lock:
+            if self.cancelled:
+                raise JobCancelled()
+            self.thread_id = get_ident()
+        try:
+            return self.fn()
+        finally:
+            with self.lock:
+                self.thread_id = None
+                # Drop an interruption that arrived after the job had already finished
+                if self.cancelled:
+                    _set_async_exc(get_ident(), None)
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.cancelled = True
+            if self.thread_id is not None:
+                _set_async_exc(self.thread_id, JobCancelled)
+
+async def run_cancellable(executor, fn, *args, **kwargs):
+    """
+    Run a blocking function on an executor and interrupt it if the awaiting task is cancelled.
+
+    The interruption is raised in the worker thread as JobCancelled as soon as it runs
+    Python code again; a call blocked in C (e.g. waiting on a socket) stops when it returns.
+    It is raised only once, so code catching BaseException or using a bare `except:` can still
+    swallow it.
+
+    Args:
+        executor (Executor | None): Executor to run on, None for the loop's default executor.
+        fn (Callable): Blocking function to run.
+        *args, **kwargs: Arguments passed to `fn`.
+    Returns:
+        The return value of `fn`.
+    """
+    job = _ThreadJob(fn, args, kwargs)
+    future = asyncio.get_running_loop().run_in_executor(executor, job)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        logger.info(f"Cancelling {getattr(fn, '__name__', 'job')} running on a worker thread")
+        job.cancel()
+        raise
@@ -0,0 +1,24 @@
+from requests import delete
+
+def delete_file(url: str, token: str, file_id: str) -> bool:
+    """
+    Delete a file from the specified URL with the provided token and file ID.
+    Args:
+        url (str): The base URL from which the file will be deleted.
+        token (str): The authorization token for the request.
+        file_id (str): The ID of the file to be deleted.
+    Returns:
+        bool: True if the file was deleted successfully, False otherwise.
+    """
+    # Ensure the URL ends with '/api/v1/files/{file_id}'
+    url = f'{url}/api/v1/files/{file_id}'
+
+    # Prepare headers for the request
+    headers = {
+        'Authorization': token,
+        'Accept': 'application/json'
+    }
+    # Send the DELETE request
+    response = delete(url, headers=headers)
+
+    return response.status_code == 200
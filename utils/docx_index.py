@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from io import BytesIO
+from json import dumps, loads
+from pathlib import Path
+import re
+import subprocess
+import sys
+
+from docx import Document
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_HEADING_PATTERN = re.compile(r"^Heading (\d+)$")
+MAX_REGEX_LENGTH = 200
+_REGEX_WORKER = str(Path(__file__).with_name("regex_worker.py"))
+
+def regex_spans(pattern: str, texts: list[tuple[int, str]], timeout: float) -> list[tuple[int, int, int]] | dict:
+    """
+    Search texts with a regular expression in a child process killed after `timeout` seconds,
+    so catastrophic backtracking cannot hold a thread of the server.
+    Args:
+        pattern (str): The regular expression, matched case-insensitively.
+        texts (list[tuple[int, str]]): Paragraph indices and texts to search.
+        timeout (float): Maximum seconds for the search.
+    Returns:
+        list[tuple[int, int, int]]: Index, start and end of the first match of each matching text.
+                                    On error: {"error": {"message": "error description"}}
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-S", _REGEX_WORKER],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    request = dumps({"pattern": pattern, "texts": texts}).encode("utf-8")
+    deadline = monotonic() + timeout
+    try:
+        # Wait in short slices so a cancellation of the calling thread is handled promptly
+        while True:
+            try:
+                output, _ = process.communicate(request, timeout=min(0.1, max(deadline - monotonic(), 0)))
+                break
+            except subprocess.TimeoutExpired:
+                request = None
+                if monotonic() >= deadline:
+                    return {"error": {"message": f"Regular expression search exceeded {timeout:g} seconds. Simplify the expression."}}
+    finally:
+        # Also reached when the search is cancelled
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    if process.returncode != 0:
+        return {"error": {"message": "Regular expression search failed"}}
+    return [tuple(span) for span in loads(output)]
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase word tokens.
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+class DocxIndex:
+    """
+    Inverted index (token -> paragraph indices) over the non-empty paragraphs of a docx document.
+
+    Paragraph indices are the same as in `full_context_docx` and `review_docx`.
+    """
+
+    def __init__(self, docx_file: BytesIO):
+        """
+        Args:
+            docx_file (BytesIO): The docx file to index.
+        """
+        self.paragraphs = {}
+        self.postings = {}
+        headings = []
+
+        for idx, paragraph in enumerate(Document(docx_file).paragraphs):
+            text = paragraph.text.strip()
+            if not text:
+                continue
+            style = paragraph.style.name if paragraph.style is not None else ""
+
+            # Track the heading path the paragraph belongs to
+            heading = _HEADING_PATTERN.match(style)
+            level = 0 if style == "Title" else int(heading.group(1)) if heading else None
+            if level is not None:
+                headings = [h for h in headings if h[0] < level] + [(level, text)]
+
+            self.paragraphs[idx] = {
+                "style": style,
+                "text": text,
+                "heading_path": [h[1] for h in headings]
+            }
+            for token in set(tokenize(text)):
+                self.postings.setdefault(token, []).append(idx)
+
+    def _candidates(self, tokens: list[str]) -> list[int]:
+        """
+        Return the sorted indices of paragraphs containing every token.
+        """
+        if not tokens:
+            return []
+        postings = sorted((self.postings.get(token, []) for token in set(tokens)), key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches.intersection_update(posting)
+        return sorted(matches)
+
+    def search(self, query: str, mode: str = "keyword", max_results: int = 20, regex_timeout: float = 5) -> dict:
+        """
+        Search the indexed paragraphs.
+        Args:
+            query (str): Keywords, exact phrase or regular expression.
+            mode (str): 'keyword' (all words, any order), 'phrase' (exact phrase, case-insensitive) or 'regex'.
+            max_results (int): Maximum number of matches returned.
+            regex_timeout (float): Maximum seconds for a regular expression search.
+        Returns:
+            dict: {"total_matches": int, "matches": [{"index", "style", "heading_path", "snippet"}]}
+                  On error: {"error": {"message": "error description"}}
+        """
+        if mode == "regex":
+            if len(query) > MAX_REGEX_LENGTH:
+                return {"error": {"message": f"Regular expression longer than {MAX_REGEX_LENGTH} characters"}}
+            try:
+                re.compile(query, re.IGNORECASE)
+            except re.error as e:
+                return {"error": {"message": f"Invalid regular expression: {e}"}}
+            spans = regex_spans(query, [(idx, paragraph["text"]) for idx, paragraph in self.paragraphs.items()], regex_timeout)
+            if isinstance(spans, dict):
+                return spans
+        else:
+            if mode == "phrase":
+                pattern = re.compile(r"\s+".join(re.escape(word) for word in query.split()), re.IGNORECASE)
+            else:
+                pattern = re.compile(r"\b(?:" + "|".join(re.escape(token) for token in set(tokenize(query))) + r")\b", re.IGNORECASE)
+            spans = []
+            for idx in self._candidates(tokenize(query)):
+                found = pattern.search(self.paragraphs[idx]["text"])
+                if found:
+                    spans.append((idx, found.start(), found.end()))
+
+        matches = []
+        for idx, start, end in spans:
+            paragraph = self.paragraphs[idx]
+            matches.append({
+                "index": idx,
+                "style": paragraph["style"],
+                "heading_path": paragraph["heading_path"],
+                "snippet": _snippet(paragraph["text"], start, end)
+            })
+
+        return {
+            "total_matches": len(matches),
+            "matches": matches[:max_results]
+        }
+
+def _snippet(text: str, start: int, end: int, width: int = 80) -> str:
+    """
+    Return the match with up to `width` characters of context on each side.
+    """
+    left = max(start - width, 0)
+    right = min(end + width, len(text))
+    return f"{'...' if left else ''}{text[left:right]}{'...' if right < len(text) else ''}"
+
+class DocxIndexCache:
+    """
+    Bounded LRU cache of DocxIndex objects.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        """
+        Args:
+            max_entries (int): Maximum number of indexed documents kept in memory.
+        """
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> DocxIndex | None:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def put(self, key: str, index: DocxIndex) -> None:
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
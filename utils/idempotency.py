@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from functools import wraps
+from hashlib import sha256
+from json import loads, JSONDecodeError
+from time import monotonic
+import asyncio
+import logging
+logging.basicConfig(level=logging.INFO, force=True)
+logger = logging.getLogger("GenFilesMCP")
+
+def is_error_result(result) -> bool:
+    """
+    Return True if a tool result is the JSON error payload returned by the tools.
+    """
+    if isinstance(result, dict):
+        return "error" in result
+    try:
+        return "error" in loads(result)
+    except (JSONDecodeError, TypeError):
+        return False
+
+class IdempotencyStore:
+    """
+    Deduplicate tool calls by key.
+
+    Calls with a key that is already running attach to the running job, and
+    successful results are served from a TTL cache. Error results are not cached
+    so that a retry can succeed. A running job is cancelled once all of its
+    callers have been cancelled.
+    """
+
+    def __init__(self, ttl: float = 600, max_entries: int = 1000):
+        """
+        Args:
+            ttl (float): Seconds a completed result is kept.
+            max_entries (int): Maximum number of completed results kept in memory.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._waiters = {}
+
+    def _get_result(self, key: str):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < monotonic():
+            del self._results[key]
+            return None
+        return result
+
+    def _set_result(self, key: str, result) -> None:
+        self._results[key] = (monotonic() + self.ttl, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def run(self, key: str, factory, is_valid=None):
+        """
+        Run `factory()` once per key.
+
+        Args:
+            key (str): Idempotency key of the call.
+            factory (Callable[[], Awaitable]): Coroutine factory that performs the work.
+            is_valid (Callable[[Any], bool] | None): Check a cached result is still usable
+                before serving it; a stale result is dropped and the work runs again.
+        Returns:
+            The result of the running or cached job for the key.
+        """
+        result = self._get_result(key)
+        if result is not None and is_valid is not None and not is_valid(result):
+            logger.info(f"Dropping stale cached result for idempotency key {key[:12]}")
+            del self._results[key]
+            result = None
+        if result is not None:
+            logger.info(f"Serving cached result for idempotency key {key[:12]}")
+            return result
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+
+            def _done(finished: asyncio.Task) -> None:
+                self._in_flight.pop(key, None)
+                if not finished.cancelled() and finished.exception() is None and not is_error_result(finished.result()):
+                    self._set_result(key, finished.result())
+
+            task.add_done_callback(_done)
+        else:
+            logger.info(f"Attaching to in-flight job for idempotency key {key[:12]}")
+
+        # Shield the job so one cancelled caller does not cancel it for the others,
+        # and cancel it once every caller waiting on it is gone
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(key) == 1 and not task.done():
+                logger.info(f"All callers cancelled, cancelling job for idempotency key {key[:12]}")
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+def idempotent(store: IdempotencyStore, tool_name: str, *fields: str, is_valid=None):
+    """
+    Decorator for MCP tools that accept an optional `idempotency_key` argument.
+
+    When no key is provided, it is derived from the values of the given argument names;
+    without argument names, only calls with an explicit key are deduplicated.
+    Keys are always scoped by the authorization header of the request.
+
+    Args:
+        store (IdempotencyStore): Store shared by the decorated tools.
+        tool_name (str): Name of the tool, used to namespace the keys.
+        *fields (str): Argument names used to derive the key.
+        is_valid (Callable[[Any], bool] | None): Check a cached result is still usable before serving it.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            # Scope keys by caller so a result is never served to another token
+            try:
+                caller = kwargs["ctx"].request_context.request.headers.get("authorization")
+            except (KeyError, AttributeError, ValueError):
+                caller = None
+
+            idempotency_key = kwargs.get("idempotency_key")
+            if not idempotency_key and not fields:
+                return await fn(*args, **kwargs)
+            if idempotency_key:
+                parts = [tool_name, str(caller), idempotency_key]
+            else:
+                parts = [tool_name, str(caller)] + [str(kwargs.get(field)) for field in fields]
+            key = sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+            return await store.run(key, lambda: fn(*args, **kwargs), is_valid)
+        return wrapper
+    return decorator
@@ -0,0 +1,262 @@
+from collections import OrderedDict
+from hashlib import sha256
+from shutil import which, rmtree
+from socket import create_connection
+from tempfile import mkdtemp
+from threading import Lock
+from time import monotonic, sleep
+from xmlrpc.client import ServerProxy, Transport
+import asyncio
+import atexit
+import subprocess
+import logging
+logging.basicConfig(level=logging.INFO, force=True)
+logger = logging.getLogger("GenFilesMCP")
+
+class _TimeoutTransport(Transport):
+    """
+    XML-RPC transport with a socket timeout.
+    """
+
+    def __init__(self, timeout: float):
+        super().__init__(use_builtin_types=True)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+class _Renderer:
+    """
+    A long-lived headless LibreOffice process driven through unoserver's XML-RPC interface.
+    """
+
+    def __init__(self, executable: str, port: int, uno_port: int, startup_timeout: float):
+        self.executable = executable
+        self.port = port
+        self.uno_port = uno_port
+        self.startup_timeout = startup_timeout
+        self.process = None
+        # Each renderer keeps its own warm LibreOffice profile
+        self.profile_dir = mkdtemp(prefix=f"genfiles-renderer-{port}-")
+
+    def start(self) -> None:
+        """
+        Start the renderer process and wait until it accepts connections.
+        """
+        process = self.process = subprocess.Popen(
+            [
+                self.executable,
+                "--interface", "127.0.0.1",
+                "--port", str(self.port),
+                "--uno-interface", "127.0.0.1",
+                "--uno-port", str(self.uno_port),
+                "--user-installation", self.profile_dir
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        deadline = monotonic() + self.startup_timeout
+        while monotonic() < deadline:
+            if self.healthy():
+                logger.info(f"PDF renderer on port {self.port} started")
+                return
+            if process.poll() is not None:
+                break
+            sleep(0.5)
+        self.stop()
+        raise RuntimeError(f"PDF renderer on port {self.port} failed to start")
+
+    def stop(self) -> None:
+        """
+        Terminate the renderer process.
+        """
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def restart(self) -> None:
+        logger.info(f"Restarting PDF renderer on port {self.port}")
+        self.stop()
+        self.start()
+
+    def healthy(self) -> bool:
+        """
+        Return True if the process is running and its XML-RPC port accepts connections.
+        """
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            create_connection(("127.0.0.1", self.port), timeout=1).close()
+            return True
+        except OSError:
+            return False
+
+    def convert(self, data: bytes, timeout: float) -> bytes:
+        """
+        Convert a document to PDF.
+        """
+        proxy = ServerProxy(f"http://127.0.0.1:{self.port}", transport=_TimeoutTransport(timeout), allow_none=True)
+        # convert(inpath, indata, outpath, convert_to)
+        return proxy.convert(None, data, None, "pdf")
+
+class PdfRendererPool:
+    """
+    Pool of persistent headless LibreOffice renderers with a job queue, per-job
+    timeouts, health checks and a PDF cache keyed by the hash of the input.
+
+    Requires `unoserver` and LibreOffice; the pool is started on first use.
+    """
+
+    def __init__(self, workers: int = 2, base_port: int = 2003, timeout: float = 60, cache_mb: float = 256, executable: str = "unoserver", startup_timeout: float = 60):
+        """
+        Args:
+            workers (int): Number of renderer processes.
+            base_port (int): First port used by the renderers; each one uses two consecutive ports.
+            timeout (float): Maximum seconds per conversion.
+            cache_mb (float): Maximum size of the PDF cache in megabytes.
+            executable (str): Path or name of the unoserver executable.
+            startup_timeout (float): Maximum seconds to wait for a renderer to start.
+        """
+        self.workers = workers
+        self.base_port = base_port
+        self.timeout = timeout
+        self.cache_bytes = int(cache_mb * 1024 * 1024)
+        self.executable = executable
+        self.startup_timeout = startup_timeout
+        self._renderers = []
+        self._idle = None
+        self._start_lock = asyncio.Lock()
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._cache_lock = Lock()
+
+    def available(self) -> bool:
+        """
+        Return True if the renderer executable is installed.
+        """
+        return which(self.executable) is not None
+
+    async def _ensure_started(self) -> None:
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            renderers = [
+                _Renderer(self.executable, self.base_port + 2 * i, self.base_port + 2 * i + 1, self.startup_timeout)
+                for i in range(self.workers)
+            ]
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(
+                *[loop.run_in_executor(None, renderer.start) for renderer in renderers],
+                return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                for renderer in renderers:
+                    renderer.stop()
+                    rmtree(renderer.profile_dir, ignore_errors=True)
+                raise errors[0]
+
+            self._renderers = renderers
+            self._idle = asyncio.Queue()
+            for renderer in renderers:
+                self._idle.put_nowait(renderer)
+            atexit.register(self.shutdown)
+
+    def shutdown(self) -> None:
+        """
+        Stop every renderer process and remove their profiles.
+        """
+        for renderer in self._renderers:
+            renderer.stop()
+            rmtree(renderer.profile_dir, ignore_errors=True)
+
+    def _cached(self, key: str) -> bytes | None:
+        with self._cache_lock:
+            pdf_data = self._cache.get(key)
+            if pdf_data is not None:
+                self._cache.move_to_end(key)
+            return pdf_data
+
+    def _store(self, key: str, pdf_data: bytes) -> None:
+        if len(pdf_data) > self.cache_bytes:
+            return
+        with self._cache_lock:
+            if key in self._cache:
+                return
+            self._cache[key] = pdf_data
+            self._cache_size += len(pdf_data)
+            while self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted)
+
+    def _restart_and_release(self, renderer: _Renderer) -> None:
+        # A timed out or failed LibreOffice may be stuck: restart it before reusing it
+        asyncio.get_running_loop().run_in_executor(None, renderer.restart).add_done_callback(
+            lambda restarted: self._release_after_restart(renderer, restarted)
+        )
+
+    def _release_when_done(self, renderer: _Renderer, job: asyncio.Future) -> None:
+        # Called once the job of a cancelled conversion has finished on its thread
+        if job.exception() is not None:
+            self._restart_and_release(renderer)
+        else:
+            self._idle.put_nowait(renderer)
+
+    def _release_after_restart(self, renderer: _Renderer, restarted: asyncio.Future) -> None:
+        # An unhealthy renderer is restarted again by the next job that gets it
+        if restarted.exception() is not None:
+            logger.error(f"Error restarting PDF renderer on port {renderer.port}: {restarted.exception()}")
+        self._idle.put_nowait(renderer)
+
+    async def convert(self, data: bytes) -> bytes | dict:
+        """
+        Convert a pptx, docx or xlsx document to PDF.
+        Args:
+            data (bytes): Content of the document.
+        Returns:
+            bytes: The PDF content.
+                   On error: {"error": {"message": "error description"}}
+        """
+        if not self.available():
+            return {"error": {"message": "PDF conversion is not available on this server"}}
+
+        key = sha256(data).hexdigest()
+        pdf_data = self._cached(key)
+        if pdf_data is not None:
+            logger.info(f"Serving cached PDF {key[:12]}")
+            return pdf_data
+
+        try:
+            await self._ensure_started()
+        except Exception as e:
+            logger.error(f"Error starting PDF renderers: {e}")
+            return {"error": {"message": f"Error starting PDF renderers: {e}"}}
+
+        # Wait for an idle renderer
+        renderer = await self._idle.get()
+        loop = asyncio.get_running_loop()
+        try:
+            if not renderer.healthy():
+                job = loop.run_in_executor(None, renderer.restart)
+                await asyncio.shield(job)
+            job = loop.run_in_executor(None, renderer.convert, data, self.timeout)
+            pdf_data = await asyncio.shield(job)
+        except asyncio.CancelledError:
+            # A blocking XML-RPC call cannot be interrupted: the renderer stays busy
+            # until its thread finishes, and only then goes back to the idle queue
+            job.add_done_callback(lambda finished: self._release_when_done(renderer, finished))
+            raise
+        except Exception as e:
+            logger.error(f"PDF conversion failed on port {renderer.port}: {e}")
+            self._restart_and_release(renderer)
+            return {"error": {"message": f"Error converting file to PDF: {e}"}}
+
+        self._idle.put_nowait(renderer)
+        self._store(key, pdf_data)
+        return pdf_data
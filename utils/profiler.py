@@ -0,0 +1,208 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from random import random
+from threading import Lock, get_ident
+from time import perf_counter
+from uuid import uuid4
+import cProfile
+import pstats
+import sys
+import logging
+logging.basicConfig(level=logging.INFO, force=True)
+logger = logging.getLogger("GenFilesMCP")
+
+# sys.monitoring events cProfile registers callbacks for (Python 3.12+)
+_PROFILER_EVENTS = ("PY_START", "PY_RESUME", "PY_RETURN", "PY_YIELD", "PY_UNWIND", "PY_THROW", "CALL", "C_RETURN", "C_RAISE")
+
+def _filter_thread(thread_id: int) -> None:
+    """
+    Restrict the active cProfile instance to one thread.
+
+    Since Python 3.12 cProfile records every thread of the interpreter through
+    sys.monitoring; its callbacks are wrapped so events of other threads are dropped.
+    """
+    monitoring = getattr(sys, "monitoring", None)
+    if monitoring is None:
+        return
+    for name in _PROFILER_EVENTS:
+        event = getattr(monitoring.events, name)
+        callback = monitoring.register_callback(monitoring.PROFILER_ID, event, None)
+        if callback is None:
+            continue
+
+        def filtered(*args, _callback=callback):
+            if get_ident() == thread_id:
+                return _callback(*args)
+
+        monitoring.register_callback(monitoring.PROFILER_ID, event, filtered)
+
+class RequestProfile:
+    """
+    Profile of a single tool call, collected stage by stage on the threads running its blocking work.
+
+    An instance created without a profiler is inert: `wrap` returns the function unchanged.
+    """
+
+    def __init__(self, profiler: "RequestProfiler | None" = None):
+        self.profiler = profiler
+        self.stages = {}
+        self.skipped = []
+        self._profiles = []
+        self._lock = Lock()
+
+    def wrap(self, stage: str, fn):
+        """
+        Return `fn` profiled as `stage` when it runs. Only the calling thread is recorded,
+        so concurrent requests and event loop idle time do not leak into the profile.
+
+        Args:
+            stage (str): Name of the stage (e.g. 'script', 'upload').
+            fn (Callable): Blocking function to profile.
+        """
+        if self.profiler is None:
+            return fn
+
+        @wraps(fn)
+        def profiled(*args, **kwargs):
+            # Only one cProfile instance can be active at a time in the interpreter
+            if not self.profiler._active_lock.acquire(blocking=False):
+                with self._lock:
+                    self.skipped.append(stage)
+                return fn(*args, **kwargs)
+
+            profile = cProfile.Profile()
+            start = perf_counter()
+            profile.enable()
+            _filter_thread(get_ident())
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                self.profiler._active_lock.release()
+                with self._lock:
+                    self._profiles.append(profile)
+                    self.stages[stage] = round(self.stages.get(stage, 0) + perf_counter() - start, 4)
+        return profiled
+
+    def stats(self) -> pstats.Stats | None:
+        with self._lock:
+            return pstats.Stats(*self._profiles) if self._profiles else None
+
+class RequestProfiler:
+    """
+    Opt-in cProfile wrapper for tool calls with a bounded in-memory store of results.
+
+    Only the blocking stages wrapped with `RequestProfile.wrap` are profiled, each on
+    the worker thread running it. Stage times are wall-clock, so they include time
+    spent waiting for the GIL or the network. A stage is skipped, and listed as such,
+    while a stage of another request is being profiled.
+
+    Profiles are keyed by a server-generated profile ID, since MCP request IDs are
+    only unique within a client session, and the oldest entry is evicted once
+    `max_entries` is reached.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.0, top_n: int = 25, max_entries: int = 100):
+        """
+        Args:
+            enabled (bool): Profile every request.
+            sample_rate (float): Fraction of requests (0.0 - 1.0) to profile when `enabled` is False.
+            top_n (int): Number of hot functions stored per request.
+            max_entries (int): Maximum number of profiles kept in memory.
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._store_lock = Lock()
+        # Only one cProfile instance can be active at a time in the interpreter
+        self._active_lock = Lock()
+
+    def _should_profile(self) -> bool:
+        return self.enabled or (self.sample_rate > 0 and random() < self.sample_rate)
+
+    @contextmanager
+    def profile(self, request_id: str, tool_name: str):
+        """
+        Collect the profile of a tool call if profiling is enabled or the request is sampled.
+        Yields a RequestProfile whose `wrap` is used on the blocking stages of the call.
+
+        Args:
+            request_id (str): ID of the MCP request, stored with the profile.
+            tool_name (str): Name of the tool being profiled.
+        """
+        if not self._should_profile():
+            yield RequestProfile()
+            return
+
+        profile = RequestProfile(self)
+        status = "ok"
+        start = perf_counter()
+        try:
+            yield profile
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            if profile.stages or profile.skipped:
+                self._save(
+                    profile_id=uuid4().hex,
+                    entry={
+                        "request_id": str(request_id),
+                        "tool": tool_name,
+                        "status": status,
+                        "created_at": datetime.now(timezone.utc).isoformat(),
+                        "duration_seconds": round(perf_counter() - start, 4),
+                        "stages": profile.stages,
+                        "skipped_stages": profile.skipped,
+                        "hot_functions": self._hot_functions(profile.stats())
+                    }
+                )
+
+    def _hot_functions(self, stats: pstats.Stats | None) -> list[dict]:
+        """
+        Return the top-N functions sorted by their own (exclusive) time.
+        """
+        if stats is None:
+            return []
+        stats = stats.stats
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top_n]
+        return [
+            {
+                "function": f"{file}:{line}({func})",
+                "ncalls": ncalls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6)
+            }
+            for (file, line, func), (_, ncalls, tottime, cumtime, _) in rows
+        ]
+
+    def _save(self, profile_id: str, entry: dict) -> None:
+        entry = {"profile_id": profile_id, **entry}
+        with self._store_lock:
+            self._profiles[profile_id] = entry
+            self._profiles.move_to_end(profile_id)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        logger.info(f"Stored profile {profile_id} for request {entry['request_id']} ({entry['tool']}, {entry['duration_seconds']}s)")
+
+    def list_profiles(self) -> list[dict]:
+        """
+        Return a summary (without hot functions) of every stored profile, newest first.
+        """
+        with self._store_lock:
+            entries = list(self._profiles.values())
+        return [
+            {k: v for k, v in entry.items() if k != "hot_functions"}
+            for entry in reversed(entries)
+        ]
+
+    def get_profile(self, profile_id: str) -> dict | None:
+        """
+        Return the full stored profile for a profile ID, or None if it does not exist.
+        """
+        with self._store_lock:
+            return self._profiles.get(profile_id)
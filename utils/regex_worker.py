@@ -0,0 +1,26 @@
+"""
+Child process running a regular expression search for `DocxIndex.search`.
+
+The regex engine cannot be interrupted from another thread, so searches run in this
+process, which the caller kills once its deadline has passed. Only the standard
+library is imported to keep the startup time short.
+
+Reads {"pattern": str, "texts": [[index, text], ...]} as JSON on stdin and writes
+[[index, start, end], ...] for the first match of each matching text on stdout.
+"""
+from json import dump, load
+import re
+import sys
+
+def main() -> None:
+    request = load(sys.stdin)
+    pattern = re.compile(request["pattern"], re.IGNORECASE)
+    spans = []
+    for idx, text in request["texts"]:
+        found = pattern.search(text)
+        if found:
+            spans.append([idx, found.start(), found.end()])
+    dump(spans, sys.stdout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from utils.script_validation import analyze_script
+from utils.cancellation import run_cancellable
+import logging
+logging.basicConfig(level=logging.INFO, force=True)
+logger = logging.getLogger("GenFilesMCP")
+
+class ScriptExecutor:
+    """
+    Validate generation scripts and run them on worker threads.
+
+    Scripts whose estimated cost exceeds `heavy_cost` run on a separate, smaller
+    pool so they cannot starve regular requests; scripts above `max_cost` are
+    rejected before execution.
+    """
+
+    def __init__(self, workers: int = 4, heavy_workers: int = 1, heavy_cost: float = 5_000_000, max_cost: float = 500_000_000):
+        """
+        Args:
+            workers (int): Number of threads running regular scripts.
+            heavy_workers (int): Number of threads running heavy scripts.
+            heavy_cost (float): Estimated cost above which a script is considered heavy.
+            max_cost (float): Estimated cost above which a script is rejected.
+        """
+        self.heavy_cost = heavy_cost
+        self.max_cost = max_cost
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="script")
+        self._heavy_pool = ThreadPoolExecutor(max_workers=heavy_workers, thread_name_prefix="heavy-script")
+
+    def analyze(self, python_script: str, file_type: str, require_buffer: bool = True) -> dict:
+        """
+        Check a script and estimate its cost before execution.
+        Args:
+            python_script (str): The Python script sent to a generate_* tool.
+            file_type (str): The output file type ('pptx', 'xlsx', 'docx', 'md').
+            require_buffer (bool): Reject scripts that never use the buffer variable of the file type.
+        Returns:
+            dict: The analysis of `analyze_script` with an additional 'heavy' flag.
+                  On rejection: {"error": {"message": "error description"}}
+        """
+        analysis = analyze_script(python_script, file_type, require_buffer)
+        if "error" in analysis:
+            logger.error(f"{analysis['error']['message']}")
+            return analysis
+
+        if analysis["cost"] > self.max_cost:
+            logger.error(f"Script rejected with estimated cost {analysis['cost']}")
+            return {
+                "error": {
+                    "message": f"Script rejected: estimated cost {analysis['cost']:.0f} exceeds the limit of {self.max_cost:.0f}. Reduce embedded data and loop sizes."
+                }
+            }
+
+        analysis["heavy"] = analysis["cost"] > self.heavy_cost
+        return analysis
+
+    async def run(self, python_script: str, context: dict, analysis: dict, runner=exec):
+        """
+        Execute a validated script on the pool matching its estimated cost.
+        The script is interrupted if the tool call is cancelled.
+        Args:
+            python_script (str): The Python script to execute.
+            context (dict): Globals of the script, including the output buffer.
+            analysis (dict): The result of `analyze` for the script.
+            runner (Callable[[str, dict], Any]): Function executing the script, `exec` by default.
+        Returns:
+            The return value of `runner`.
+        """
+        pool = self._heavy_pool if analysis.get("heavy") else self._pool
+        if analysis.get("heavy"):
+            logger.info(f"Running heavy script (estimated cost {analysis['cost']:.0f}) on the heavy pool")
+        return await run_cancellable(pool, runner, python_script, context)
@@ -0,0 +1,231 @@
+import ast
+import operator
+
+# Modules a generation script may import, per output file type
+COMMON_IMPORTS = {
+    "numpy", "math", "statistics", "random", "datetime", "calendar", "decimal", "fractions",
+    "collections", "itertools", "functools", "string", "textwrap", "re", "json", "copy", "typing", "enum"
+}
+ALLOWED_IMPORTS = {
+    "pptx": COMMON_IMPORTS | {"pptx"},
+    "docx": COMMON_IMPORTS | {"docx"},
+    "xlsx": COMMON_IMPORTS | {"openpyxl"},
+    "md": COMMON_IMPORTS | {"pypandoc"}
+}
+
+# Buffer variable each script has to write to, defined in the server.py file
+BUFFER_NAMES = {
+    "pptx": "pptx_buffer",
+    "docx": "docx_buffer",
+    "xlsx": "xlsx_buffer",
+    "md": "md_buffer"
+}
+
+# Builtins and attributes that would bypass the allowed import list
+FORBIDDEN_NAMES = {"__import__", "eval", "exec", "compile", "open", "input", "breakpoint", "globals", "vars"}
+FORBIDDEN_ATTRIBUTES = {"__subclasses__", "__globals__", "__builtins__", "__code__", "__bases__", "__mro__", "__loader__"}
+
+# Constant expressions larger than this are treated as unbounded
+MAX_CONSTANT = 10 ** 15
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: operator.pow
+}
+
+class ScriptRejected(Exception):
+    """
+    Raised when a script fails the pre-execution checks.
+    """
+
+def _constant_number(node: ast.AST) -> float | None:
+    """
+    Evaluate a constant integer expression such as `10 ** 6` or `-5`, or return None.
+    Values too large to evaluate safely are returned as infinity.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _constant_number(node.operand)
+        return -value if value is not None else None
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        left, right = _constant_number(node.left), _constant_number(node.right)
+        if left is None or right is None:
+            return None
+        if float("inf") in (abs(left), abs(right)):
+            return float("inf")
+        if isinstance(node.op, ast.Pow) and (right < 0 or (abs(left) > 1 and right > 64)):
+            return float("inf") if right > 0 else None
+        if isinstance(node.op, ast.FloorDiv) and right == 0:
+            return None
+        value = _BINARY_OPERATORS[type(node.op)](left, right)
+        return value if abs(value) <= MAX_CONSTANT else float("inf")
+    return None
+
+def _has_break(body: list[ast.stmt]) -> bool:
+    """
+    Return True if a loop body can leave the loop with break, return or raise.
+    """
+    for statement in body:
+        for node in ast.walk(statement):
+            if isinstance(node, (ast.Break, ast.Return, ast.Raise)):
+                return True
+    return False
+
+class _ScriptAnalyzer(ast.NodeVisitor):
+    """
+    Walk a script once, enforcing the import rules and accumulating cost estimates.
+    """
+
+    def __init__(self, allowed_imports: set[str]):
+        self.allowed_imports = allowed_imports
+        self.names = set()
+        self.literal_bytes = 0
+        self.loop_iterations = 0
+        self._multiplier = 1
+
+    def _check_module(self, module: str | None, node: ast.AST) -> None:
+        root = (module or "").split(".")[0]
+        if root not in self.allowed_imports:
+            raise ScriptRejected(f"Import of '{module}' is not allowed (line {node.lineno}). Allowed packages: {', '.join(sorted(self.allowed_imports))}")
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self._check_module(alias.name, node)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.level:
+            raise ScriptRejected(f"Relative imports are not allowed (line {node.lineno})")
+        self._check_module(node.module, node)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if node.id in FORBIDDEN_NAMES:
+            raise ScriptRejected(f"Use of '{node.id}' is not allowed (line {node.lineno})")
+        self.names.add(node.id)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        if node.attr in FORBIDDEN_ATTRIBUTES:
+            raise ScriptRejected(f"Access to '{node.attr}' is not allowed (line {node.lineno})")
+        self.generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        if isinstance(node.value, (str, bytes)):
+            self.literal_bytes += len(node.value) * self._multiplier
+
+    def visit_BinOp(self, node: ast.BinOp) -> None:
+        # Powers such as 2 ** 10 ** 10 hang the worker before any loop runs
+        if isinstance(node.op, ast.Pow):
+            base, exponent = _constant_number(node.left), _constant_number(node.right)
+            if base is not None and exponent is not None and abs(base) > 1 and exponent > 100_000:
+                raise ScriptRejected(f"Constant expression too large (line {node.lineno})")
+
+        # Repeated literals such as "x" * 10 ** 9
+        if isinstance(node.op, ast.Mult):
+            for literal, count in ((node.left, node.right), (node.right, node.left)):
+                times = _constant_number(count)
+                if isinstance(literal, ast.Constant) and isinstance(literal.value, (str, bytes)) and literal.value and times is not None:
+                    self.literal_bytes += len(literal.value) * max(times, 0) * self._multiplier
+        self.generic_visit(node)
+
+    def _iterations(self, iterable: ast.AST) -> float:
+        """
+        Estimate the number of iterations of a for loop or comprehension.
+        """
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.func.id == "range":
+            bounds = [_constant_number(arg) for arg in iterable.args]
+            if bounds and None not in bounds:
+                start, stop = (0, bounds[0]) if len(bounds) == 1 else (bounds[0], bounds[1])
+                step = bounds[2] if len(bounds) == 3 else 1
+                if step == 0:
+                    return 1
+                if float("inf") in (abs(start), abs(stop)):
+                    return float("inf")
+                return max((stop - start) // step, 0)
+        if isinstance(iterable, (ast.List, ast.Tuple, ast.Set)):
+            return len(iterable.elts)
+        return 1
+
+    def _visit_loop(self, iterations: float, children: list[ast.AST]) -> None:
+        previous = self._multiplier
+        self._multiplier = previous * max(iterations, 1)
+        self.loop_iterations += previous * iterations
+        for child in children:
+            self.visit(child)
+        self._multiplier = previous
+
+    def visit_For(self, node: ast.For) -> None:
+        iterable = node.iter
+        # itertools.count(), cycle() and repeat(x) never stop on their own
+        if isinstance(iterable, ast.Call):
+            func = iterable.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            infinite = name in ("count", "cycle") or (name == "repeat" and len(iterable.args) < 2 and not iterable.keywords)
+            if infinite and not _has_break(node.body):
+                raise ScriptRejected(f"Unbounded loop over {name}() without break (line {node.lineno})")
+        self.visit(node.iter)
+        self._visit_loop(self._iterations(iterable), [node.target] + node.body + node.orelse)
+
+    def visit_While(self, node: ast.While) -> None:
+        test = node.test
+        if isinstance(test, ast.Constant) and test.value and not _has_break(node.body):
+            raise ScriptRejected(f"Unbounded 'while' loop without break (line {node.lineno})")
+        self.visit(node.test)
+        self._visit_loop(1, node.body + node.orelse)
+
+    def _visit_comprehension(self, node: ast.AST, elements: list[ast.AST]) -> None:
+        iterations = 1
+        for generator in node.generators:
+            self.visit(generator.iter)
+            iterations *= max(self._iterations(generator.iter), 1)
+        children = [generator.target for generator in node.generators] + [c for g in node.generators for c in g.ifs] + elements
+        self._visit_loop(iterations, children)
+
+    def visit_ListComp(self, node: ast.ListComp) -> None:
+        self._visit_comprehension(node, [node.elt])
+
+    def visit_SetComp(self, node: ast.SetComp) -> None:
+        self._visit_comprehension(node, [node.elt])
+
+    def visit_GeneratorExp(self, node: ast.GeneratorExp) -> None:
+        self._visit_comprehension(node, [node.elt])
+
+    def visit_DictComp(self, node: ast.DictComp) -> None:
+        self._visit_comprehension(node, [node.key, node.value])
+
+def analyze_script(python_script: str, file_type: str, require_buffer: bool = True) -> dict:
+    """
+    Parse a generation script once and check it before execution.
+
+    This is a guard against mistakes and runaway scripts, not a sandbox.
+
+    Args:
+        python_script (str): The Python script sent to a generate_* tool.
+        file_type (str): The output file type ('pptx', 'xlsx', 'docx', 'md').
+        require_buffer (bool): Reject scripts that never use the buffer variable of the file type.
+    Returns:
+        dict: {"literal_bytes": int, "loop_iterations": float, "cost": float} with the estimated cost of the script.
+              On rejection: {"error": {"message": "error description"}}
+    """
+    try:
+        tree = ast.parse(python_script)
+    except SyntaxError as e:
+        return {"error": {"message": f"Invalid Python script: {e.msg} (line {e.lineno})"}}
+
+    analyzer = _ScriptAnalyzer(ALLOWED_IMPORTS[file_type])
+    try:
+        analyzer.visit(tree)
+    except ScriptRejected as e:
+        return {"error": {"message": f"Script rejected: {e}"}}
+
+    buffer_name = BUFFER_NAMES[file_type]
+    if require_buffer and buffer_name not in analyzer.names:
+        return {"error": {"message": f"Script rejected: the file has to be saved to '{buffer_name}'"}}
+
+    return {
+        "literal_bytes": analyzer.literal_bytes,
+        "loop_iterations": analyzer.loop_iterations,
+        "cost": analyzer.literal_bytes + analyzer.loop_iterations
+    }
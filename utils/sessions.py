@@ -0,0 +1,267 @@
+from collections import OrderedDict
+from functools import wraps
+from io import BytesIO
+from threading import Lock, local
+from time import monotonic
+from uuid import uuid4
+from zipfile import ZipFile
+import asyncio
+import logging
+logging.basicConfig(level=logging.INFO, force=True)
+logger = logging.getLogger("GenFilesMCP")
+
+# Name of the live object in the globals of edit_session scripts, per file type
+SESSION_OBJECT_NAMES = {
+    "pptx": "prs",
+    "docx": "doc",
+    "xlsx": "wb"
+}
+
+# Memory of a parsed XML part relative to its uncompressed size, measured for
+# python-pptx, python-docx and openpyxl objects (about 4-5x)
+XML_MEMORY_FACTOR = 5
+
+# Edit scripts with more estimated loop iterations are measured right away
+MEASURE_LOOP_ITERATIONS = 1000
+
+_capture = local()
+_hooks_installed = False
+
+def _capturing_save(original):
+    """
+    Wrap a library save method to record the object saved to the buffer being captured
+    by the current thread.
+    """
+    @wraps(original)
+    def save(self, file, *args, **kwargs):
+        if file is not None and file is getattr(_capture, "buffer", None):
+            _capture.document = self
+        return original(self, file, *args, **kwargs)
+    return save
+
+def install_save_hooks() -> None:
+    """
+    Hook the save methods of Presentation, Document and Workbook so `exec_capturing` can
+    keep the live object a script saves. The hooks are inert outside `exec_capturing`.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from pptx.presentation import Presentation
+    from docx.document import Document
+    from openpyxl.workbook.workbook import Workbook
+
+    for cls in (Presentation, Document, Workbook):
+        cls.save = _capturing_save(cls.save)
+    _hooks_installed = True
+
+def exec_capturing(python_script: str, context: dict, buffer) -> object:
+    """
+    Execute a generation script and return the Presentation, Document or Workbook it saved to `buffer`.
+    """
+    _capture.buffer = buffer
+    _capture.document = None
+    try:
+        exec(python_script, context)
+        if _capture.document is None:
+            raise ValueError("The script did not save a Presentation, Document or Workbook to the buffer")
+        return _capture.document
+    finally:
+        _capture.buffer = None
+        _capture.document = None
+
+def estimate_memory(package: BytesIO) -> int:
+    """
+    Estimate the memory held by the live object of a saved pptx, docx or xlsx package.
+
+    XML parts are counted at XML_MEMORY_FACTOR times their uncompressed size, other parts
+    (images, embedded files) at their uncompressed size.
+    """
+    with ZipFile(package) as archive:
+        return sum(
+            info.file_size * (XML_MEMORY_FACTOR if info.filename.endswith((".xml", ".rels")) else 1)
+            for info in archive.infolist()
+        )
+
+def measure_document(document: object) -> int:
+    """
+    Save a live Presentation, Document or Workbook to a throwaway buffer and estimate its memory.
+    """
+    buffer = BytesIO()
+    document.save(buffer)
+    return estimate_memory(buffer)
+
+class EditingSession:
+    """
+    A live document kept in memory between tool calls.
+    """
+
+    def __init__(self, handle: str, file_type: str, file_name: str, user_id: str, owner: str, document: object, size_bytes: int):
+        self.handle = handle
+        self.file_type = file_type
+        self.file_name = file_name
+        self.user_id = user_id
+        self.owner = owner
+        self.document = document
+        self.size_bytes = size_bytes
+        # Edits applied since the document was last measured
+        self.edits_since_measure = 0
+        # Globals shared by the edit scripts of the session
+        self.context = {}
+        # Edits and commits of a session run one at a time
+        self.lock = asyncio.Lock()
+        self.last_used = monotonic()
+
+class SessionStore:
+    """
+    In-memory editing sessions with idle-timeout eviction and a memory cap.
+
+    The memory of a session is estimated with `estimate_memory` when it is opened and
+    re-measured every `measure_every` edits, or right away after an edit with large loops;
+    in between, each edit adds the size of the literals of its script. Sessions in use by
+    an edit or a commit are never evicted. Idle sessions are closed by a background sweep
+    running while sessions are open.
+    """
+
+    def __init__(self, idle_timeout: float = 900, max_mb: float = 512, max_sessions: int = 32, measure_every: int = 5):
+        """
+        Args:
+            idle_timeout (float): Seconds after which an unused session is closed.
+            max_mb (float): Maximum estimated memory of all sessions in megabytes.
+            max_sessions (int): Maximum number of open sessions.
+            measure_every (int): Number of edits after which the memory of a session is re-measured.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_sessions = max_sessions
+        self.measure_every = measure_every
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+        self._sweeper = None
+
+    def _evict_idle(self) -> None:
+        now = monotonic()
+        for handle in [h for h, s in self._sessions.items() if now - s.last_used > self.idle_timeout and not s.lock.locked()]:
+            logger.info(f"Closing idle editing session {handle}")
+            del self._sessions[handle]
+
+    async def _sweep(self) -> None:
+        """
+        Close idle sessions periodically, until no session is left.
+        """
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60))
+            with self._lock:
+                self._evict_idle()
+                if not self._sessions:
+                    self._sweeper = None
+                    return
+
+    def _start_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+
+    def _make_room(self, size_bytes: int, new_session: bool, exclude: str | None = None) -> bool:
+        """
+        Close the least recently used sessions that are not in use until a session of
+        `size_bytes` fits. Returns False if it still does not fit.
+        """
+        def full() -> bool:
+            others = sum(s.size_bytes for h, s in self._sessions.items() if h != exclude)
+            return (new_session and len(self._sessions) >= self.max_sessions) or others + size_bytes > self.max_bytes
+
+        for handle in [h for h, s in self._sessions.items() if h != exclude and not s.lock.locked()]:
+            if not full():
+                break
+            logger.info(f"Closing editing session {handle} to free memory")
+            del self._sessions[handle]
+        return not full()
+
+    def create(self, file_type: str, file_name: str, user_id: str, owner: str, document: object, size_bytes: int) -> dict:
+        """
+        Open a session for a live document, evicting the least recently used sessions if needed.
+        Returns:
+            dict: {"session_handle": str, "idle_timeout_seconds": float}
+                  On error: {"error": {"message": "error description"}}
+        """
+        if size_bytes > self.max_bytes:
+            return {"error": {"message": "Document too large to keep in an editing session"}}
+
+        with self._lock:
+            self._evict_idle()
+            if not self._make_room(size_bytes, new_session=True):
+                return {"error": {"message": "No editing session available, every open session is in use. Retry later or generate the file without keep_session."}}
+
+            session = EditingSession(uuid4().hex, file_type, file_name, user_id, owner, document, size_bytes)
+            self._sessions[session.handle] = session
+            self._start_sweeper()
+
+        logger.info(f"Opened editing session {session.handle} for {file_name}.{file_type}")
+        return {
+            "session_handle": session.handle,
+            "idle_timeout_seconds": self.idle_timeout
+        }
+
+    def should_measure(self, session: EditingSession, analysis: dict) -> bool:
+        """
+        Return True if the document has to be measured after the edit analysed in `analysis`.
+        """
+        return session.edits_since_measure + 1 >= self.measure_every or analysis["loop_iterations"] > MEASURE_LOOP_ITERATIONS
+
+    def estimate_edit(self, session: EditingSession, analysis: dict) -> int:
+        """
+        Estimate the memory of a session after an edit without measuring the document.
+        """
+        return session.size_bytes + int(analysis["literal_bytes"] * XML_MEMORY_FACTOR)
+
+    def resize(self, handle: str, size_bytes: int, measured: bool = True) -> dict | None:
+        """
+        Update the estimated memory of a session after an edit, evicting other sessions if needed.
+        The session is closed if it no longer fits.
+        Args:
+            handle (str): Handle of the session.
+            size_bytes (int): New estimated memory of the session.
+            measured (bool): Whether `size_bytes` comes from measuring the document.
+        Returns:
+            dict | None: None if the session fits, otherwise {"error": {"message": "error description"}}.
+        """
+        with self._lock:
+            session = self._sessions.get(handle)
+            if session is None:
+                return {"error": {"message": f"Editing session {handle} not found or expired"}}
+            if size_bytes > self.max_bytes or not self._make_room(size_bytes, new_session=False, exclude=handle):
+                del self._sessions[handle]
+                logger.info(f"Closed editing session {handle}: document too large after edit")
+                return {"error": {"message": "Document too large to keep in an editing session after this edit; the session was closed. Regenerate the file without keep_session."}}
+            session.size_bytes = size_bytes
+            session.edits_since_measure = 0 if measured else session.edits_since_measure + 1
+            return None
+
+    def is_open(self, handle: str) -> bool:
+        """
+        Return True if a session is still open.
+        """
+        with self._lock:
+            self._evict_idle()
+            return handle in self._sessions
+
+    def get(self, handle: str, owner: str) -> EditingSession | dict:
+        """
+        Return an open session of the caller and mark it as used.
+        Returns:
+            EditingSession: The session.
+                            On error: {"error": {"message": "error description"}}
+        """
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(handle)
+            if session is None or session.owner != owner:
+                return {"error": {"message": f"Editing session {handle} not found or expired"}}
+            session.last_used = monotonic()
+            self._sessions.move_to_end(handle)
+            return session
+
+    def close(self, handle: str) -> None:
+        with self._lock:
+            if self._sessions.pop(handle, None) is not None:
+                logger.info(f"Closed editing session {handle}")
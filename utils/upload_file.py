@@ -10,7 +10,7 @@ def upload_file(url: str, token: str, file_data: BytesIO, filename:str, file_typ
         token (str): The authorization token for the request.
         file_data (BytesIO):  with .name attribute set to the full filename.
         filename (str): The desired filename for the uploaded file (without extension).
-        file_type (str): The file extension/type (e.g., 'pptx', 'xlsx', 'docx', 'md').
+        file_type (str): The file extension/type (e.g., 'pptx', 'xlsx', 'docx', 'md', 'pdf').
     Returns:
         dict: Contains 'file_path_download' with a markdown hyperlink for downloading the uploaded file.
               Format: "[Download {filename}.{file_type}](/api/v1/files/{id}/content)"
@@ -21,7 +21,8 @@ def upload_file(url: str, token: str, file_data: BytesIO, filename:str, file_typ
         'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
         'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'md': 'text/markdown'
+        'md': 'text/markdown',
+        'pdf': 'application/pdf'
     }
     
     mime_type = mime_types.get(file_type, 'application/octet-stream')